@@ -1,98 +1,165 @@
 import serial
-import time
 import sys
 import os
+import base64
+import json
+import struct
 
-# Configuration
-import serial.tools.list_ports
+from pico_port import find_pico_port, enable_low_latency
 
 # Configuration
 BAUD = 115200
+CHUNK_SIZE = 1024  # Bytes of file data per write command
+RAW_PASTE = True  # Cleared if the firmware doesn't support raw-paste mode
 
-def find_pico_port():
-    """Find the Pico's serial port automatically."""
-    ports = list(serial.tools.list_ports.comports())
-    print(f"Available ports: {[p.device for p in ports]}")
-    
-    # Look for likely candidates
-    candidates = []
-    for p in ports:
-        # macOS Pico usually shows up as usbmodem
-        if "usbmodem" in p.device:
-            candidates.append(p.device)
-        # Linux/Windows might show up differently, but usbmodem is key for Mac
-        elif "Board in FS mode" in p.description or "MicroPython" in p.description:
-            candidates.append(p.device)
-            
-    if not candidates:
-        return None
-        
-    # Return the first candidate
-    return candidates[0]
+# (local path, path on the Pico), uploaded in one raw REPL session
+FILES_TO_UPLOAD = [
+    ("pico_upload/motor_control.py", "motor_control.py"),
+    ("pico_upload/commands.py", "commands.py"),
+    ("pico_upload/main.py", "main.py"),
+]
 
-def write_file(ser, local_path, remote_path):
-    print(f"Uploading {local_path} to {remote_path}...")
-    
-    with open(local_path, 'rb') as f:
-        content = f.read()
-    
-    # Enter Raw REPL
+def exec_raw(ser, code):
+    """Execute code in the raw REPL and return its output.
+
+    Uses raw-paste mode (flow controlled, no echo) when the firmware supports
+    it, otherwise the plain raw REPL. Raises RuntimeError if the device
+    reports an error or stops responding.
+    """
+    global RAW_PASTE
+    if isinstance(code, str):
+        code = code.encode('utf-8')
+
+    sent = False
+    if RAW_PASTE:
+        ser.write(b'\x05A\x01')
+        reply = ser.read(2)
+        if reply == b'R\x01':
+            raw_paste_write(ser, code)
+            sent = True
+        else:
+            # Older firmware: fall back to the plain raw REPL for this session
+            RAW_PASTE = False
+            if reply != b'R\x00':
+                ser.read_until(b'>')
+
+    if not sent:
+        ser.write(code + b'\x04')
+        if ser.read(2) != b'OK':
+            raise RuntimeError("device did not accept command")
+
+    # Output is terminated by \x04, then errors by \x04, then the '>' prompt
+    out = ser.read_until(b'\x04')
+    err = ser.read_until(b'\x04')
+    if not err.endswith(b'\x04'):
+        raise RuntimeError("timed out waiting for device")
+    ser.read_until(b'>')
+    if err[:-1]:
+        raise RuntimeError(err[:-1].decode('utf-8', errors='replace').strip())
+    return out[:-1]
+
+def raw_paste_write(ser, code):
+    """Stream code to the device honouring raw-paste flow control."""
+    window_size = struct.unpack('<H', ser.read(2))[0]
+    window_remain = window_size
+
+    i = 0
+    while i < len(code):
+        # Device sends \x01 each time it frees another window of input
+        while window_remain == 0 or ser.in_waiting:
+            data = ser.read(1)
+            if data == b'\x01':
+                window_remain += window_size
+            elif data == b'\x04':
+                ser.write(b'\x04')
+                return
+            else:
+                raise RuntimeError(f"unexpected data during raw paste: {data}")
+        block = code[i:i + window_remain]
+        ser.write(block)
+        window_remain -= len(block)
+        i += len(block)
+
+    # End of data; device acknowledges with \x04 before executing
+    ser.write(b'\x04')
+    if not ser.read_until(b'\x04').endswith(b'\x04'):
+        raise RuntimeError("device did not acknowledge raw paste")
+
+def enter_raw_repl(ser):
+    """Interrupt the running program and switch to the raw REPL"""
     print("Interrupting running program...")
-    ser.write(b'\x03') # Ctrl+C
-    time.sleep(0.5)
-    ser.write(b'\x03') # Ctrl+C again
-    time.sleep(0.5)
-    ser.write(b'\x03') # Ctrl+C third time
-    time.sleep(0.5)
+    # Ctrl+C twice in one write, then wait for the REPL prompt rather than
+    # sleeping a fixed time between each interrupt
+    ser.write(b'\r\x03\x03')
+    ser.flush()
+    ser.read_until(b'>>> ')
     
-    ser.write(b'\x01') # Ctrl+A (Enter Raw REPL)
-    time.sleep(0.5)
-    if not b'raw REPL' in ser.read_all():
+    ser.reset_input_buffer()
+    ser.write(b'\r\x01') # Ctrl+A (Enter Raw REPL)
+    # Block until the raw REPL banner and prompt arrive (bounded by ser.timeout)
+    if not ser.read_until(b'raw REPL; CTRL-B to exit\r\n>').endswith(b'>'):
         print("Failed to enter raw REPL")
         return False
+    return True
+
+def write_file(ser, content, remote_path):
+    """Upload one file's contents. The raw REPL must already be active."""
+    print(f"Uploading {remote_path} ({len(content)} bytes)...")
 
     # Open file
-    cmd = f"f = open('{remote_path}', 'wb')".encode('utf-8')
-    ser.write(cmd + b'\x04') # Execute
-    time.sleep(0.1)
+    exec_raw(ser, f"from binascii import a2b_base64\nf = open('{remote_path}', 'wb')")
     
-    # Write chunks
-    chunk_size = 64
-    for i in range(0, len(content), chunk_size):
-        chunk = content[i:i+chunk_size]
-        cmd = f"f.write({chunk})".encode('utf-8')
-        ser.write(cmd + b'\x04')
-        # Wait for OK
-        start = time.time()
-        while time.time() - start < 1.0:
-            if b'OK' in ser.read_all():
-                break
-            time.sleep(0.01)
-        print(f"\rProgress: {i}/{len(content)} bytes", end="")
+    # Write chunks, base64 encoded so each command stays compact
+    for i in range(0, len(content), CHUNK_SIZE):
+        chunk = base64.b64encode(content[i:i + CHUNK_SIZE])
+        exec_raw(ser, b"f.write(a2b_base64(b'" + chunk + b"'))")
+        print(f"\rProgress: {min(i + CHUNK_SIZE, len(content))}/{len(content)} bytes", end="")
         
     print("\nClosing file...")
-    ser.write(b"f.close()" + b'\x04')
-    time.sleep(0.1)
-    ser.read_all()
-    
-    # Exit Raw REPL
-    ser.write(b'\x02') # Ctrl+B
+    exec_raw(ser, "f.close()")
     print("Done.")
     return True
 
+def verify_uploads(ser, uploads):
+    """Compare uploaded file sizes against the local copies in one REPL exchange"""
+    out = exec_raw(ser, "import os, json\nprint(json.dumps({f: os.stat(f)[6] for f in os.listdir()}))")
+    remote_sizes = json.loads(out)
+
+    ok = True
+    for content, remote_path in uploads:
+        size = remote_sizes.get(remote_path)
+        if size != len(content):
+            print(f"Verify failed: {remote_path} is {size} bytes on the Pico, expected {len(content)}")
+            ok = False
+    if ok:
+        print(f"Verified {len(uploads)} files on the Pico")
+    return ok
+
 def main():
     try:
         port = find_pico_port()
         if not port:
-            print("Error: No Pico found (looked for 'usbmodem')")
-            print("Please check connection or update find_pico_port()")
+            print("Error: No Pico found (looked for Raspberry Pi USB VID 0x2E8A)")
+            print("Please check the USB connection")
             return
 
         print(f"Using port: {port}")
+
+        # Read everything up front so a missing file fails before the Pico
+        # has been interrupted
+        uploads = []
+        for local_path, remote_path in FILES_TO_UPLOAD:
+            with open(local_path, 'rb') as f:
+                uploads.append((f.read(), remote_path))
         
         ser = serial.Serial(port, BAUD, timeout=1)
-        write_file(ser, "pico_upload/motor_control.py", "motor_control.py")
-        write_file(ser, "pico_upload/main.py", "main.py")
+        enable_low_latency(ser)
+        # Interrupt and enter the raw REPL once, then stream every file
+        if enter_raw_repl(ser):
+            for content, remote_path in uploads:
+                write_file(ser, content, remote_path)
+            verify_uploads(ser, uploads)
+            ser.write(b'\x02') # Ctrl+B (Exit Raw REPL)
         ser.close()
         
         # Soft reset
@@ -1,19 +1,21 @@
 import serial
-import time
+from pico_port import find_pico_port, enable_low_latency
 
-port = "/dev/cu.usbmodem11401"
+port = find_pico_port() or "/dev/cu.usbmodem11401"
 try:
-    ser = serial.Serial(port, 115200, timeout=0.1)
+    ser = serial.Serial(port, 115200, timeout=0.5)
+    enable_low_latency(ser)
     print(f"Connecting to {port}...")
     
-    # Send Ctrl+C repeatedly
-    for i in range(20):
-        ser.write(b'\x03')
-        time.sleep(0.1)
-        response = ser.read_all()
+    # Send Ctrl+C and block until the prompt shows up (or the timeout expires)
+    ser.write(b'\x03\x03')
+    for attempt in range(4):
+        if attempt:
+            ser.write(b'\r\x03')
+        response = ser.read_until(b'>>> ', size=256)
         if response:
             print(f"Response: {response}")
-            if b'>>>' in response:
+            if response.endswith(b'>>> '):
                 print("REPL detected!")
                 break
     
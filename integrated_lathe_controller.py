@@ -16,26 +16,100 @@ Bridge → GUI: JSON status updates
 """
 
 import serial
+import sys
+import glob
 import json
+import re
 import time
-import threading
-import queue
-import math
 import os
-import tempfile
 
 # Import motor control only if running on MicroPython (Pico)
 try:
-    from motor_control import MotorController  # Import existing motor control
+    from motor_control import MotorController, MODE_POSITION, MODE_VELOCITY  # Import existing motor control
     MICROPYTHON_AVAILABLE = True
 except ImportError:
     MICROPYTHON_AVAILABLE = False
     MotorController = None
 
+import logging
 import socket
-import select
+import selectors
+
+# orjson parses GUI commands several times faster when installed; its
+# JSONDecodeError subclasses json's, so callers catch the same exception
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pico_port import find_pico_port, enable_low_latency
+
+log = logging.getLogger("lathe")
+
+# The Pico's status line, also produced by the local motor controller:
+# "Position: -135.94 degrees, Velocity: 0.00 RPM, Mode: velocity"
+STATUS_LINE_FORMAT = "Position: {:.2f} degrees, Velocity: {:.2f} RPM, Mode: {}"
+POSITION_RE = re.compile(rb"Position:\s*(-?\d+(?:\.\d+)?)\s*degrees")
+
+# Hot-path Pico command, formatted directly to bytes:
+# spring_wall <forceN> <dir flag> <freqHz> <yieldN>
+SPRING_WALL_FORMAT = b"spring_wall %.2f %d %.1f %.1f\r\n"
+
+# Control loop periods, in time.monotonic_ns() units
+STATUS_INTERVAL_NS = 250_000_000       # Status resend to the GUI while nothing changes
+PICO_POLL_INTERVAL_NS = 10_000_000     # 100Hz Pico polling while it isn't streaming
+PICO_STALE_NS = 100_000_000            # Status stream counts as stopped after this
+SAFETY_INTERVAL_NS = 50_000_000        # 20Hz safety checks
+HEARTBEAT_INTERVAL_NS = 1_000_000_000  # 1Hz heartbeat
+
+# Linux-only latency options for the GUI socket. Python doesn't export
+# SO_BUSY_POLL, so its value from <asm-generic/socket.h> is used on Linux.
+TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+SO_BUSY_POLL = getattr(socket, "SO_BUSY_POLL",
+                       46 if sys.platform.startswith("linux") else None)
+SO_PRIORITY = getattr(socket, "SO_PRIORITY", None)
+
+# Status message sent to the GUI whenever it changes. The schema is fixed, so it is
+# filled in with str.format rather than building and json.dumps-ing a dict.
+# mode and skill_level are JSON-encoded into the template (the %s fields) only
+# when they change; the remaining {} fields are numbers.
+STATUS_TEMPLATE = ('{{"type":"status_update","handle_wheel_position":{!r},'
+                   '"mode":%s,"skill_level":%s,"emergency_stop":{},'
+                   '"spindle_rpm":{!r},"feed_rate":{!r},"timestamp":{!r}}}\n')
+
+def tune_gui_socket(sock):
+    """Set low-latency options on an accepted GUI connection.
+
+    TCP_NODELAY is portable; the rest are best effort and silently skipped
+    where the platform (or missing privileges) doesn't allow them.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    for level, option, value in ((socket.IPPROTO_TCP, TCP_QUICKACK, 1),
+                                 (socket.SOL_SOCKET, SO_BUSY_POLL, 50),  # µs
+                                 (socket.SOL_SOCKET, SO_PRIORITY, 6)):
+        if option is None:
+            continue
+        try:
+            sock.setsockopt(level, option, value)
+        except OSError:
+            pass
 
 class LatheController:
+    __slots__ = (
+        "pico_serial", "motor_controller", "pico_serial_port",
+        "server_socket", "client_socket", "gui_rx", "host", "port",
+        "current_mode", "skill_level", "emergency_stop",
+        "handle_wheel_position", "tool_feed_rate", "spindle_rpm",
+        "target_velocity", "active_axis", "haptic_active", "haptic_force",
+        "vib_freq", "yield_force", "status_template",
+        "gui_handlers", "motor_actions", "local_commands",
+        "max_velocity", "max_position_error", "heartbeat_timeout",
+        "pico_stream_interval_ms", "pico_streaming", "last_pico_status_time",
+        "pico_rx", "pico_tx", "status_pending",
+    )
+
     def __init__(self, pico_serial_port="/dev/cu.usbmodem2101"):
         self.pico_serial = None
         self.motor_controller = None
@@ -44,14 +118,10 @@ class LatheController:
         # TCP Socket Server for GUI communication
         self.server_socket = None
         self.client_socket = None
+        self.gui_rx = bytearray()  # Partial line carried between recv calls
         self.host = '127.0.0.1'
         self.port = 5005
         
-        # Communication queues
-        self.gui_to_bridge = queue.Queue()
-        self.bridge_to_gui = queue.Queue()
-        self.pico_to_bridge = queue.Queue()
-
         # Current state
         self.current_mode = "manual"
         self.skill_level = "beginner"
@@ -63,470 +133,699 @@ class LatheController:
         self.active_axis = "Z"
         self.haptic_active = False
         self.haptic_force = 0.0
+        self.update_status_template()
+
+        # GUI message type -> handler
+        self.gui_handlers = {
+            "status_request": self.handle_status_request,
+            "mode_change": self.handle_mode_change,
+            "emergency_stop": self.handle_emergency_stop,
+            "motor_control": self.handle_motor_control,
+            "zero_position": self.handle_zero_position,
+            "axis_select": self.handle_axis_select,
+            "haptic_feedback": self.handle_haptic_feedback,
+            "haptic_vector": self.handle_haptic_vector,
+        }
+        # motor_control action -> handler
+        self.motor_actions = {
+            "forward": self.motor_forward,
+            "reverse": self.motor_reverse,
+            "stop": self.motor_stop,
+            "speed": self.motor_speed,
+            "position": self.motor_position,
+        }
+        # Local motor controller command -> handler
+        self.local_commands = {
+            "pos": self.local_pos,
+            "vel": self.local_vel,
+            "stop": self.local_stop,
+            "spring_wall": self.local_spring_wall,
+            "status": self.local_status,
+        }
 
         # Safety limits
         self.max_velocity = 100.0
         self.max_position_error = 10.0
         self.heartbeat_timeout = 5.0
 
+        # The Pico pushes its status line at this interval once it has
+        # acknowledged "stream"; until then (e.g. older firmware) the bridge
+        # polls it with "status"
+        self.pico_stream_interval_ms = 10
+        self.pico_streaming = False
+        self.last_pico_status_time = 0  # time.monotonic_ns()
+
+        self.pico_rx = bytearray()  # Partial line carried between reads
+
+        # Output queued during a loop iteration, see flush_output
+        self.pico_tx = bytearray()
+        self.status_pending = False
+
         # Initialize connections
         self.initialize_connections()
 
-        # Try to connect to Pico motor controller
-        try:
-            self.pico_serial = serial.Serial(self.pico_serial_port, 921600, timeout=0.1) # High speed baud
-            print(f"Connected to Pico on {self.pico_serial_port}")
-        except serial.SerialException as e:
-            print(f"Failed to connect to Pico: {e}")
-            self.pico_serial = None
-
     def initialize_connections(self):
         """Initialize TCP server and serial connection to Pico"""
         # Start TCP Server
+        server = None
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Disable Nagle's algorithm
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(1)
-            self.server_socket.setblocking(False)
-            print(f"TCP Server listening on {self.host}:{self.port}")
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Disable Nagle's algorithm
+            server.bind((self.host, self.port))
+            server.listen(1)
+            server.setblocking(False)
+            self.server_socket = server
+            log.info("TCP Server listening on %s:%s", self.host, self.port)
         except Exception as e:
-            print(f"Failed to start TCP server: {e}")
+            log.error("Failed to start TCP server: %s", e)
+            # A socket that never reached listen() would report readable forever,
+            # so it is closed rather than kept
+            if server is not None:
+                server.close()
 
-        # ... (rest of method)
-
-    def run_control_loop(self):
-        """Main control loop with safety monitoring"""
-        last_status_time = 0
-        status_interval = 0.016  # ~60Hz updates to GUI (match screen refresh)
-        
-        last_pico_status_req = 0
-        pico_status_interval = 0.01  # 100Hz Pico polling (balanced load)
-        
-        last_safety_check = 0
-        safety_check_interval = 0.05  # 20Hz safety checks
-        
-        last_heartbeat_check = 0
-        heartbeat_check_interval = 1.0  # 1Hz heartbeat
+        self.connect_pico()
 
         # Initialize motor controller if running locally
         if not self.pico_serial and MICROPYTHON_AVAILABLE:
             try:
                 self.motor_controller = MotorController()
-                print("Using local motor controller")
+                log.info("Using local motor controller")
             except Exception as e:
-                print(f"Failed to initialize local controller: {e}")
+                log.error("Failed to initialize local controller: %s", e)
+
+    def connect_pico(self):
+        """Open the serial connection to the Pico motor controller"""
+        if not self.pico_serial_port:
+            log.info("No Pico port given")
+            return
+        try:
+            # write_timeout: a Pico that stops draining its USB buffer must not
+            # block the control loop inside flush_output
+            self.pico_serial = serial.Serial(self.pico_serial_port, 921600, timeout=0.1,
+                                             write_timeout=0.05) # High speed baud
+            enable_low_latency(self.pico_serial)
+            log.info("Connected to Pico on %s", self.pico_serial_port)
+            self.send_to_pico(f"stream {self.pico_stream_interval_ms}")
+            self.flush_output()
+        except serial.SerialException as e:
+            log.error("Failed to connect to Pico: %s", e)
+            self.pico_serial = None
+            # The cached scan may point at a port that has since gone away
+            find_pico_port.cache_clear()
 
     def accept_gui_connection(self):
         """Check for new GUI client connections"""
         if self.server_socket:
             try:
-                readable, _, _ = select.select([self.server_socket], [], [], 0)
-                if readable:
-                    client, addr = self.server_socket.accept()
-                    client.setblocking(False)
-                    self.client_socket = client
-                    print(f"GUI Connected from {addr}")
+                client, addr = self.server_socket.accept()
+                client.setblocking(False)
+                tune_gui_socket(client)
+                self.client_socket = client
+                self.gui_rx.clear()
+                self.update_status()  # New client gets the current state at once
+                log.info("GUI Connected from %s", addr)
+            except BlockingIOError:
+                pass  # No connection pending
             except Exception as e:
-                print(f"Error accepting connection: {e}")
+                log.error("Error accepting connection: %s", e)
 
     def read_gui_commands(self):
-        """Read commands from TCP socket"""
+        """Read all pending commands from TCP socket, oldest first"""
+        commands = []
         if not self.client_socket:
             self.accept_gui_connection()
-            return None
+            return commands
 
+        sock = self.client_socket
+        # The sockets are non-blocking and the control loop's selector
+        # wakes it when data arrives, so no per-call select() is needed
         try:
-            # Check if data is available
-            readable, _, _ = select.select([self.client_socket], [], [], 0)
-            if readable:
-                data = self.client_socket.recv(4096)
-                if not data:
-                    print("GUI Disconnected")
-                    self.client_socket.close()
-                    self.client_socket = None
-                    return None
-                
-                # Split by newline in case multiple commands arrived
-                commands = data.decode().strip().split('\n')
-                last_valid_cmd = None
-                
-                for cmd_str in commands:
-                    if not cmd_str: continue
-                    
-                    # Handle "FORCE:" command (High-speed haptic update)
-                    if cmd_str.startswith("FORCE:"):
-                        try:
-                            # Format: FORCE:Fx,Fz,Freq,Yield
-                            parts = cmd_str.split(":")[1].split(",")
-                            if len(parts) >= 3:
-                                fx = float(parts[0])
-                                fz = float(parts[1])
-                                freq = float(parts[2])
-                                yield_force = float(parts[3]) if len(parts) >= 4 else 50.0  # Default 50N
-                                
-                                # Construct a command dict compatible with process_gui_command
-                                last_valid_cmd = {
-                                    "type": "haptic_vector",
-                                    "fx": fx,
-                                    "fz": fz,
-                                    "freq": freq,
-                                    "yield": yield_force
-                                }
-                        except ValueError:
-                            print(f"Invalid FORCE command: {cmd_str}")
-                            pass
-                    else:
-                        try:
-                            cmd = json.loads(cmd_str)
-                            last_valid_cmd = cmd
-                        except json.JSONDecodeError:
-                            pass
-                
-                return last_valid_cmd
-                
-        except Exception as e:
-            print(f"Socket receive error: {e}")
+            data = sock.recv(65536)
+        except BlockingIOError:
+            return commands
+        except OSError as e:
+            log.error("Socket receive error: %s", e)
+            sock.close()
+            self.client_socket = None
+            return commands
+        if not data:
+            log.info("GUI Disconnected")
+            sock.close()
             self.client_socket = None
-            return None
+            return commands
+        if TCP_QUICKACK is not None:
+            # Quick-ACK mode is one-shot: the kernel drops back to delayed
+            # ACKs after a while, so it is re-armed after every read
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+            except OSError:
+                pass
+
+        # TCP doesn't preserve message boundaries: only complete lines are
+        # parsed, and a partial trailing line waits in gui_rx for the rest
+        rx = self.gui_rx
+        rx += data
+        end = rx.rfind(b"\n")
+        if end < 0:
+            if len(rx) > 65536:
+                log.warning("Discarding %d bytes of unterminated GUI input", len(rx))
+                rx.clear()
+            return commands
+        lines = rx[:end].split(b"\n")
+        del rx[:end + 1]
+        # FORCE updates supersede each other, so only the newest in a
+        # batch is kept; every JSON command is kept, in order
+        force_index = None
+        
+        for cmd_str in lines:
+            if not cmd_str: continue
             
-        return None
+            # Handle "FORCE:" command (High-speed haptic update)
+            if cmd_str.startswith(b"FORCE:"):
+                try:
+                    # Format: FORCE:Fx,Fz,Freq,Yield
+                    parts = cmd_str[6:].split(b",")
+                    if len(parts) >= 3:
+                        fx = float(parts[0])
+                        fz = float(parts[1])
+                        freq = float(parts[2])
+                        yield_force = float(parts[3]) if len(parts) >= 4 else 50.0  # Default 50N
+                        
+                        # Construct a command dict compatible with process_gui_command
+                        cmd = {
+                            "type": "haptic_vector",
+                            "fx": fx,
+                            "fz": fz,
+                            "freq": freq,
+                            "yield": yield_force
+                        }
+                        if force_index is not None:
+                            del commands[force_index]
+                        force_index = len(commands)
+                        commands.append(cmd)
+                except ValueError:
+                    log.warning("Invalid FORCE command: %s", cmd_str.decode(errors="replace"))
+                    pass
+            else:
+                try:
+                    cmd = json_loads(cmd_str)
+                except ValueError:  # Bad JSON or bad UTF-8, from either parser
+                    continue
+                # Only objects carry a "type" to dispatch on
+                if isinstance(cmd, dict):
+                    commands.append(cmd)
+
+        return commands
 
     def send_to_pico(self, command):
         """Send command to Pico motor controller"""
         if self.pico_serial:
-            try:
-                # Send command
-                cmd_bytes = (command + "\r\n").encode()
-                self.pico_serial.write(cmd_bytes)
-                
-                # Don't wait for response here to avoid blocking the high-speed loop
-                # We read responses in the main loop
-                
-            except Exception as e:
-                print(f"❌ Error communicating with Pico: {e}")
-                return None
+            # Queued and written by flush_output at the end of the loop
+            # iteration, so all commands from one iteration share one write.
+            # Responses are read in the main loop, never waited for here.
+            self.pico_tx += command.encode()
+            self.pico_tx += b"\r\n"
         elif self.motor_controller:
             # Handle local motor controller commands
             return self.handle_local_command(command)
 
+    def flush_output(self):
+        """Write the queued Pico commands and any pending GUI status"""
+        if self.pico_tx:
+            if self.pico_serial:
+                try:
+                    self.pico_serial.write(self.pico_tx)
+                except (serial.SerialException, OSError) as e:
+                    log.error("❌ Error communicating with Pico: %s", e)
+            self.pico_tx.clear()
+
+        # Status messages supersede each other, so however many were
+        # requested this iteration only the current state is sent
+        if self.status_pending:
+            self.status_pending = False
+            self.send_status()
+
     def handle_local_command(self, command):
         """Handle commands for local motor controller"""
         parts = command.strip().split()
         if not parts:
             return "OK"
 
-        cmd = parts[0].lower()
-
-        if cmd == "pos" and len(parts) == 2:
-            try:
-                pos = float(parts[1])
-                self.motor_controller.target_position = pos
-                self.motor_controller.control_mode = "position"
-                return f"Position set to {pos} degrees"
-            except ValueError:
-                return "Invalid position"
-
-        elif cmd == "vel" and len(parts) == 2:
-            try:
-                vel = float(parts[1])
-                self.motor_controller.target_velocity = vel
-                self.motor_controller.control_mode = "velocity"
-                return f"Velocity set to {vel} RPM"
-            except ValueError:
-                return "Invalid velocity"
-
-        elif cmd == "stop":
-            self.motor_controller.stop_motor()
-            return "Motor stopped"
-
-        elif cmd == "spring_wall" and len(parts) >= 2:
-            try:
-                force_val = float(parts[1])
-                wall_flag = float(parts[2]) if len(parts) >= 3 else 1.0
-                self.motor_controller.set_spring_wall(force_val, wall_flag)
-                return f"Virtual wall {'engaged' if force_val > 0 and wall_flag != 0 else 'released'}"
-            except ValueError:
-                return "Invalid spring_wall values"
-
-        elif cmd == "status":
-            pos = self.motor_controller.get_position_degrees()
-            vel = self.motor_controller.get_velocity_rpm()
-            status = f"Position: {pos:.2f} degrees, Velocity: {vel:.2f} RPM, Mode: {self.motor_controller.control_mode}"
-            if getattr(self.motor_controller, "wall_engaged", False):
-                status += f", Wall @ {self.motor_controller.wall_contact_position_deg:.2f}°"
-            return status
-
+        handler = self.local_commands.get(parts[0].lower())
+        if handler:
+            return handler(parts)
         return "Unknown command"
 
+    def local_pos(self, parts):
+        """pos <degrees>"""
+        if len(parts) != 2:
+            return "Unknown command"
+        try:
+            pos = float(parts[1])
+            self.motor_controller.target_position = pos
+            self.motor_controller.set_mode(MODE_POSITION)
+            return f"Position set to {pos} degrees"
+        except ValueError:
+            return "Invalid position"
+
+    def local_vel(self, parts):
+        """vel <rpm>"""
+        if len(parts) != 2:
+            return "Unknown command"
+        try:
+            vel = float(parts[1])
+            self.motor_controller.target_velocity = vel
+            self.motor_controller.set_mode(MODE_VELOCITY)
+            return f"Velocity set to {vel} RPM"
+        except ValueError:
+            return "Invalid velocity"
+
+    def local_stop(self, parts):
+        """stop"""
+        self.motor_controller.stop_motor()
+        return "Motor stopped"
+
+    def local_spring_wall(self, parts):
+        """spring_wall <forceN> [active]"""
+        if len(parts) < 2:
+            return "Unknown command"
+        try:
+            force_val = float(parts[1])
+            wall_flag = float(parts[2]) if len(parts) >= 3 else 1.0
+            self.motor_controller.set_spring_wall(force_val, wall_flag)
+            return f"Virtual wall {'engaged' if force_val > 0 and wall_flag != 0 else 'released'}"
+        except ValueError:
+            return "Invalid spring_wall values"
+
+    def local_status(self, parts):
+        """status"""
+        motor = self.motor_controller
+        status = STATUS_LINE_FORMAT.format(motor.get_position_degrees(),
+                                           motor.get_velocity_rpm(),
+                                           motor.control_mode)
+        if getattr(motor, "wall_engaged", False):
+            status += f", Wall @ {motor.wall_contact_position_deg:.2f}°"
+        return status
+
     def process_gui_command(self, data):
         """Process parsed JSON command from GUI"""
-        try:
-            cmd_type = data.get("type")
-            
-            if cmd_type == "status_request":
-                # Trigger immediate update for low latency
-                self.update_status()
-                
-            elif cmd_type == "mode_change":
-                self.current_mode = data.get("mode", "manual")
-                self.skill_level = data.get("skill_level", "beginner")
-                print(f"Mode changed to: {self.current_mode} ({self.skill_level})")
-                
-            elif cmd_type == "emergency_stop":
-                self.emergency_stop = True
-                self.send_to_pico("stop")
-                print("🚨 EMERGENCY STOP ACTIVATED")
-                
-            elif cmd_type == "motor_control":
-                action = data.get("action")
-                if action == "forward":
-                    self.send_to_pico(f"vel {self.target_velocity}")
-                elif action == "reverse":
-                    self.send_to_pico(f"vel {-self.target_velocity}")
-                elif action == "stop":
-                    print("⚙️  Sending to Pico: stop")
-                    response = self.send_to_pico("stop")
-                    print(f"✅ Pico response: {response}")
-                    print("Motor: Stop")
-                elif action == "speed":
-                    speed_value = float(data.get("value", 50.0))
-                    self.target_velocity = speed_value
-                    print(f"Motor speed set to: {speed_value} RPM")
-                elif action == "position":
-                    delta = float(data.get("delta", 0.0))
-                    current_pos = self.handle_wheel_position
-                    target_pos = current_pos + delta
-                    print(f"⚙️  Sending to Pico: pos {target_pos}")
-                    response = self.send_to_pico(f"pos {target_pos}")
-                    print(f"✅ Pico response: {response}")
-                    print(f"Motor position: {current_pos:.1f}° → {target_pos:.1f}°")
-                    
-            elif cmd_type == "zero_position":
-                axis = data.get("axis")
-                print(f"Zeroing {axis} axis")
-                # We don't zero the motor for this, just the GUI offset
-                
-            elif cmd_type == "axis_select":
-                self.active_axis = data.get("axis", "Z")
-                print(f"Active axis: {self.active_axis}")
-                
-            elif cmd_type == "haptic_feedback":
-                self.haptic_active = data.get("active", False)
-                self.haptic_force = data.get("force", 0.0)
-                self.vib_freq = data.get("freq", 10.0)
-                self.yield_force = data.get("yield", 50.0) # Default to rigid
-                
-                # SPINDLE OFF = Very high damping (100x)
-                # Use vib_freq=0 to signal spindle off to Pico
-                if self.spindle_rpm < 1.0:
-                    self.vib_freq = 0.0
-                
-                if self.haptic_active and self.pico_serial:
-                    physical_force = (self.haptic_force / 100.0) * 50.0
-                    
-                    # FIX: Handle negative forces correctly
-                    # wall_active needs to be non-zero to engage
-                    # Use sign of force as direction hint (1 or -1) * 2 to be safe > 1.0
-                    if abs(physical_force) > 0.1:
-                        wall_dir = 1 if physical_force >= 0 else -1
-                        wall_active = wall_dir * 2 
-                    else:
-                        wall_active = 0
-                        
-                    # Send absolute force magnitude, direction is handled by wall_active sign
-                    self.send_to_pico(f"spring_wall {abs(physical_force):.2f} {wall_active} {self.vib_freq:.1f} {self.yield_force:.1f}")
-                    print(f"🧱 Wall: {physical_force:.1f}N, Dir: {wall_active}, Freq: {self.vib_freq:.1f}Hz, Spindle: {self.spindle_rpm:.0f}RPM")
-                elif not self.haptic_active and self.pico_serial:
-                    self.send_to_pico("spring_wall 0 0")
-                    
-            elif cmd_type == "haptic_vector":
-                # New high-speed vector format with material yield
-                fx = data.get("fx", 0.0)
-                fz = data.get("fz", 0.0)
-                freq = data.get("freq", 0.0)
-                yield_force = data.get("yield", 50.0)  # Material-specific yield
-                
-                # Determine which axis is active/dominant
-                total_force = fx if abs(fx) > abs(fz) else fz
-                
-                # Map to Pico direction
-                direction = 1 if total_force >= 0 else -1
-                force_mag = abs(total_force)
-                
-                # Send to Pico with yield value
-                wall_flag = direction * 2
-                
-                self.send_to_pico(f"spring_wall {force_mag:.2f} {wall_flag} {freq:.1f} {yield_force:.1f}")
-
-        except json.JSONDecodeError as e:
-            print(f"Error processing GUI command: {e}")
-        except Exception as e:
-            print(f"Error processing GUI command: {e}")
+        handler = self.gui_handlers.get(data.get("type"))
+        if handler:
+            try:
+                handler(data)
+            except Exception as e:
+                log.error("Error processing GUI command: %s", e)
+
+    def handle_status_request(self, data):
+        """Reply to a status request right away"""
+        self.update_status()
+
+    def handle_mode_change(self, data):
+        """Switch lathe mode and skill level"""
+        self.current_mode = data.get("mode", "manual")
+        self.skill_level = data.get("skill_level", "beginner")
+        self.update_status_template()
+        self.update_status()
+        log.info("Mode changed to: %s (%s)", self.current_mode, self.skill_level)
+
+    def handle_emergency_stop(self, data):
+        """Latch the emergency stop and stop the motor"""
+        self.emergency_stop = True
+        self.send_to_pico("stop")
+        self.update_status()
+        log.warning("🚨 EMERGENCY STOP ACTIVATED")
+
+    def handle_motor_control(self, data):
+        """Manual motor commands from the GUI"""
+        action = self.motor_actions.get(data.get("action"))
+        if action:
+            action(data)
+
+    def motor_forward(self, data):
+        """Run forward at the target velocity"""
+        self.send_to_pico(f"vel {self.target_velocity}")
+
+    def motor_reverse(self, data):
+        """Run in reverse at the target velocity"""
+        self.send_to_pico(f"vel {-self.target_velocity}")
+
+    def motor_stop(self, data):
+        """Stop the motor"""
+        log.debug("⚙️  Sending to Pico: stop")
+        response = self.send_to_pico("stop")
+        log.debug("✅ Pico response: %s", response)
+        log.info("Motor: Stop")
+
+    def motor_speed(self, data):
+        """Set the target velocity for forward/reverse"""
+        speed_value = float(data.get("value", 50.0))
+        self.target_velocity = speed_value
+        log.info("Motor speed set to: %s RPM", speed_value)
+
+    def motor_position(self, data):
+        """Move the handle wheel by a relative delta"""
+        delta = float(data.get("delta", 0.0))
+        current_pos = self.handle_wheel_position
+        target_pos = current_pos + delta
+        log.debug("⚙️  Sending to Pico: pos %s", target_pos)
+        response = self.send_to_pico(f"pos {target_pos}")
+        log.debug("✅ Pico response: %s", response)
+        log.info("Motor position: %.1f° → %.1f°", current_pos, target_pos)
+
+    def handle_zero_position(self, data):
+        """Zero an axis (GUI offset only)"""
+        axis = data.get("axis")
+        log.info("Zeroing %s axis", axis)
+        # We don't zero the motor for this, just the GUI offset
+
+    def handle_axis_select(self, data):
+        """Select which axis the handle wheel drives"""
+        self.active_axis = data.get("axis", "Z")
+        log.info("Active axis: %s", self.active_axis)
+
+    def handle_haptic_feedback(self, data):
+        """Engage or release the virtual wall from a haptic_feedback message"""
+        self.haptic_active = data.get("active", False)
+        self.haptic_force = data.get("force", 0.0)
+        self.vib_freq = data.get("freq", 10.0)
+        self.yield_force = data.get("yield", 50.0) # Default to rigid
+
+        # SPINDLE OFF = Very high damping (100x)
+        # Use vib_freq=0 to signal spindle off to Pico
+        if self.spindle_rpm < 1.0:
+            self.vib_freq = 0.0
+
+        if self.haptic_active and self.pico_serial:
+            physical_force = (self.haptic_force / 100.0) * 50.0
+
+            # FIX: Handle negative forces correctly
+            # wall_active needs to be non-zero to engage
+            # Use sign of force as direction hint (1 or -1) * 2 to be safe > 1.0
+            if abs(physical_force) > 0.1:
+                wall_dir = 1 if physical_force >= 0 else -1
+                wall_active = wall_dir * 2 
+            else:
+                wall_active = 0
+
+            # Send absolute force magnitude, direction is handled by wall_active sign
+            self.pico_tx += SPRING_WALL_FORMAT % (abs(physical_force), wall_active,
+                                                  self.vib_freq, self.yield_force)
+            log.debug("🧱 Wall: %.1fN, Dir: %s, Freq: %.1fHz, Spindle: %.0fRPM", physical_force, wall_active, self.vib_freq, self.spindle_rpm)
+        elif not self.haptic_active and self.pico_serial:
+            self.send_to_pico("spring_wall 0 0")
+
+    def handle_haptic_vector(self, data):
+        """Forward a FORCE vector to the Pico as a spring wall"""
+        # High-speed vector format with material yield
+        fx = data.get("fx", 0.0)
+        fz = data.get("fz", 0.0)
+        freq = data.get("freq", 0.0)
+        yield_force = data.get("yield", 50.0)  # Material-specific yield
+
+        # Determine which axis is active/dominant
+        total_force = fx if abs(fx) > abs(fz) else fz
+
+        # Map to Pico direction
+        direction = 1 if total_force >= 0 else -1
+        force_mag = abs(total_force)
+
+        # Send to Pico with yield value
+        wall_flag = direction * 2
+
+        if self.pico_serial:
+            # Formatted straight into the queued output, as this runs for
+            # every FORCE message
+            self.pico_tx += SPRING_WALL_FORMAT % (force_mag, wall_flag, freq, yield_force)
+        else:
+            self.send_to_pico(f"spring_wall {force_mag:.2f} {wall_flag}")
+
+    def update_status_template(self):
+        """Pre-format the status fields that only change with the mode"""
+        # The values come from the GUI and the template is later passed to
+        # str.format, so braces in them must be escaped
+        mode, skill = (json.dumps(value).replace("{", "{{").replace("}", "}}")
+                       for value in (self.current_mode, self.skill_level))
+        self.status_template = STATUS_TEMPLATE % (mode, skill)
 
     def update_status(self):
+        """Schedule a status update to the GUI for the next flush_output"""
+        self.status_pending = True
+
+    def send_status(self):
         """Send status update to GUI via TCP"""
-        status = {
-            "type": "status_update",
-            "handle_wheel_position": self.handle_wheel_position,
-            "mode": self.current_mode,
-            "skill_level": self.skill_level,
-            "emergency_stop": self.emergency_stop,
-            "spindle_rpm": self.spindle_rpm,
-            "feed_rate": self.tool_feed_rate,
-            "timestamp": time.time()
-        }
-        
         if self.client_socket:
             try:
-                msg = json.dumps(status) + "\n"
+                msg = self.status_template.format(
+                    float(self.handle_wheel_position),
+                    "true" if self.emergency_stop else "false",
+                    float(self.spindle_rpm),
+                    float(self.tool_feed_rate),
+                    time.time()
+                )
                 self.client_socket.sendall(msg.encode())
-            except Exception as e:
-                print(f"Socket send error: {e}")
+            except OSError as e:
+                log.error("Socket send error: %s", e)
+                self.client_socket.close()
                 self.client_socket = None
 
     def perform_safety_checks(self):
         """Perform real-time safety checks"""
-        try:
-            # Check motor position limits
-            if self.motor_controller:
-                current_pos = self.motor_controller.get_position_degrees()
-                # Add your position limits here based on your mechanical setup
-                # For example: if abs(current_pos) > 360.0:  # One full rotation limit
-                #     self.emergency_stop = True
-                #     self.send_to_pico("stop")
-                #     print("Position limit exceeded - emergency stop")
-
-            # Check motor velocity limits
-            if self.motor_controller:
-                current_vel = abs(self.motor_controller.get_velocity_rpm())
-                if current_vel > self.max_velocity:
-                    print(f"Velocity limit exceeded: {current_vel} RPM")
-                    self.send_to_pico("stop")
-                    # Don't set emergency_stop for velocity limits, just stop
-
-            # Check for motor stall (if velocity is 0 but we're commanding movement)
-            # This would require tracking commanded vs actual velocity
+        # Check motor position limits
+        if self.motor_controller:
+            current_pos = self.motor_controller.get_position_degrees()
+            # Add your position limits here based on your mechanical setup
+            # For example: if abs(current_pos) > 360.0:  # One full rotation limit
+            #     self.emergency_stop = True
+            #     self.send_to_pico("stop")
+            #     print("Position limit exceeded - emergency stop")
+
+        # Check motor velocity limits
+        if self.motor_controller:
+            current_vel = abs(self.motor_controller.get_velocity_rpm())
+            if current_vel > self.max_velocity:
+                log.warning("Velocity limit exceeded: %s RPM", current_vel)
+                self.send_to_pico("stop")
+                # Don't set emergency_stop for velocity limits, just stop
 
-        except Exception as e:
-            print(f"Safety check error: {e}")
+        # Check for motor stall (if velocity is 0 but we're commanding movement)
+        # This would require tracking commanded vs actual velocity
 
     def read_pico_response(self):
-        """Non-blocking read from Pico"""
+        """Non-blocking read of every complete line the Pico has sent"""
+        if not self.pico_serial:
+            return False
+        try:
+            # One read for the whole burst instead of a readline per line;
+            # a partial trailing line waits in pico_rx for the rest
+            waiting = self.pico_serial.in_waiting
+            if not waiting:
+                return False
+            rx = self.pico_rx
+            rx += self.pico_serial.read(waiting)
+        except (serial.SerialException, OSError) as e:
+            # A vanished port stays readable forever; drop it rather than spin
+            log.error("Lost connection to Pico: %s", e)
+            self.pico_serial.close()
+            self.pico_serial = None
+            return False
+
+        end = rx.rfind(b"\n")
+        if end < 0:
+            if len(rx) > 65536:
+                rx.clear()
+            return False
+        lines = rx[:end].split(b"\n")
+        del rx[:end + 1]
+
         updated = False
-        if self.pico_serial and self.pico_serial.in_waiting > 0:
-            try:
-                line = self.pico_serial.readline().decode().strip()
-                if line:
-                    # Print everything from Pico for debugging
-                    print(f"[PICO] {line}")
-                    
-                    # Parse status updates
-                    if "Position:" in line:
-                        # Parse: Position: -135.94 degrees, Velocity: ...
-                        parts = line.split(',')
-                        for part in parts:
-                            if "Position:" in part:
-                                try:
-                                    pos_str = part.split(':')[1].replace('degrees', '').strip()
-                                    new_pos = float(pos_str)
-                                    if new_pos != self.handle_wheel_position:
-                                        self.handle_wheel_position = new_pos
-                                        updated = True
-                                except:
-                                    pass
-                    return updated
-            except Exception:
-                pass
-        return False
+        debug = log.isEnabledFor(logging.DEBUG)
+        for line in lines:
+            # Parsed as raw bytes; only the matched number is converted
+            line = line.strip()
+            if not line:
+                continue
+            # Print everything from Pico for debugging
+            if debug:
+                log.debug("[PICO] %s", line.decode(errors="replace"))
+
+            if line.startswith(b"OK: Status stream"):
+                self.pico_streaming = line != b"OK: Status stream off"
+                self.last_pico_status_time = time.monotonic_ns()
+                continue
+
+            # Parse status updates
+            match = POSITION_RE.search(line)
+            if match:
+                self.last_pico_status_time = time.monotonic_ns()
+                new_pos = float(match.group(1))
+                if new_pos != self.handle_wheel_position:
+                    self.handle_wheel_position = new_pos
+                    updated = True
+        return updated
 
     def run_control_loop(self):
         """Main control loop with safety monitoring"""
+        # All times are integer nanoseconds from time.monotonic_ns()
         last_status_time = 0
-        status_interval = 0.033  # Keep as fallback heartbeat
+        status_interval = STATUS_INTERVAL_NS
         
         last_pico_status_req = 0
-        pico_status_interval = 0.01  # 100Hz Pico polling
+        pico_status_interval = PICO_POLL_INTERVAL_NS
+        pico_stale_timeout = PICO_STALE_NS
         
         last_safety_check = 0
-        safety_check_interval = 0.05  # 20Hz safety checks
+        safety_check_interval = SAFETY_INTERVAL_NS
         
         last_heartbeat_check = 0
-        heartbeat_check_interval = 1.0  # 1Hz heartbeat
+        heartbeat_check_interval = HEARTBEAT_INTERVAL_NS
+        heartbeat_timeout = int(self.heartbeat_timeout * 1_000_000_000)
 
         # Safety state tracking
         consecutive_errors = 0
         max_consecutive_errors = 10
-        last_gui_heartbeat = time.time()
+        last_gui_heartbeat = time.monotonic_ns()
         gui_connected = False
 
-        print("Starting control loop (500Hz)...")
+        # Sleep until the GUI socket or the Pico has data, or the next periodic
+        # task is due, instead of waking every 2 ms to check
+        selector = selectors.DefaultSelector()
+        # Serial ports are only selectable on POSIX
+        pico_fd = None
+        if self.pico_serial and os.name == "posix":
+            pico_fd = self.pico_serial.fileno()
+            selector.register(pico_fd, selectors.EVENT_READ)
+        # Only one socket is watched: the GUI client while connected, otherwise
+        # the listening socket so a new connection wakes the loop
+        watched_socket = None
+        # With a Pico that can't be selected on, or the local motor controller
+        # to step, keep the old 500 Hz cadence as an upper bound on the wait
+        if self.motor_controller or (self.pico_serial and pico_fd is None):
+            max_wait = 0.002
+        else:
+            max_wait = None
+
+        # Bind the per-iteration lookups once. Deadlines use the monotonic
+        # clock so a wall-clock adjustment can't fire or mask the heartbeat.
+        now = time.monotonic_ns
+        read_gui_commands = self.read_gui_commands
+        process_gui_command = self.process_gui_command
+        read_pico_response = self.read_pico_response
+        send_to_pico = self.send_to_pico
+        update_status = self.update_status
+        perform_safety_checks = self.perform_safety_checks
+        flush_output = self.flush_output
+        motor = self.motor_controller
+        wait_for_io = selector.select
+
+        log.info("Starting control loop (event driven)...")
 
         while not self.emergency_stop:
-            current_time = time.time()
+            current_time = now()
 
-            # 1. Read GUI Commands
-            gui_command = self.read_gui_commands()
-            if gui_command:
-                try:
-                    if isinstance(gui_command, str):
-                        self.process_gui_command(gui_command)
-                    else:
-                        self.process_gui_command(gui_command)
+            # One handler for the whole iteration: a failure is logged and the
+            # loop carries on, unless it keeps failing
+            try:
+                # 1. Read GUI Commands
+                for gui_command in read_gui_commands():
+                    process_gui_command(gui_command)
                     last_gui_heartbeat = current_time
                     gui_connected = True
-                    consecutive_errors = 0
-                except Exception as e:
-                    print(f"Error processing GUI command: {e}")
-
-            # 2. Read Pico Responses & Trigger Immediate Update
-            if self.read_pico_response():
-                self.update_status()
-                last_status_time = current_time
-
-            # 3. Poll Pico Status
-            if current_time - last_pico_status_req > pico_status_interval:
-                if self.pico_serial:
-                    self.send_to_pico("status")
-                last_pico_status_req = current_time
-
-            # 4. Safety checks
-            if current_time - last_safety_check > safety_check_interval:
-                self.perform_safety_checks()
-                last_safety_check = current_time
-
-            # 5. Heartbeat monitoring
-            if current_time - last_heartbeat_check > heartbeat_check_interval:
-                if gui_connected and current_time - last_gui_heartbeat > self.heartbeat_timeout:
-                    print("GUI heartbeat timeout - activating safety stop")
-                    self.emergency_stop = True
-                    self.send_to_pico("stop")
-                last_heartbeat_check = current_time
-
-            # 6. Periodic Status Heartbeat (if no updates recently)
-            if current_time - last_status_time > status_interval:
-                self.update_status()
-                last_status_time = current_time
 
-            # 7. Run motor control loop if using local controller
-            if self.motor_controller and not self.emergency_stop:
-                try:
-                    if self.motor_controller.control_mode == "position":
-                        self.motor_controller.position_control()
-                    elif self.motor_controller.control_mode == "velocity":
-                        self.motor_controller.velocity_control()
-                except Exception as e:
-                    print(f"Motor control error: {e}")
+                # 2. Read Pico Responses & Trigger Immediate Update
+                if read_pico_response():
+                    update_status()
+                    last_status_time = current_time
+
+                # 3. Poll Pico Status, unless it is streaming it
+                if self.pico_streaming and current_time - self.last_pico_status_time > pico_stale_timeout:
+                    # Stream went quiet (e.g. the Pico reset); poll until it is
+                    # acknowledged again
+                    self.pico_streaming = False
+                    send_to_pico(f"stream {self.pico_stream_interval_ms}")
+                if not self.pico_streaming and current_time - last_pico_status_req > pico_status_interval:
+                    if self.pico_serial:
+                        send_to_pico("status")
+                    last_pico_status_req = current_time
+
+                # 4. Safety checks
+                if current_time - last_safety_check > safety_check_interval:
+                    perform_safety_checks()
+                    last_safety_check = current_time
+
+                # 5. Heartbeat monitoring
+                if current_time - last_heartbeat_check > heartbeat_check_interval:
+                    if gui_connected and current_time - last_gui_heartbeat > heartbeat_timeout:
+                        log.warning("GUI heartbeat timeout - activating safety stop")
+                        self.emergency_stop = True
+                        send_to_pico("stop")
+                    last_heartbeat_check = current_time
+
+                # 6. Status Heartbeat: changes are sent as they happen, so this
+                # only resends an unchanged status every 250 ms, well inside the
+                # GUI's 1 s heartbeat interval
+                if current_time - last_status_time > status_interval:
+                    update_status()
+                    last_status_time = current_time
+
+                # 7. Run motor control loop if using local controller
+                if motor and not self.emergency_stop:
+                    try:
+                        mode = motor.mode
+                        if mode == MODE_POSITION:
+                            motor.position_control()
+                        elif mode == MODE_VELOCITY:
+                            motor.velocity_control()
+                    except Exception as e:
+                        log.error("Motor control error: %s", e)
+                        self.emergency_stop = True
+
+                # One write per link for everything this iteration produced
+                flush_output()
+                consecutive_errors = 0
+            except Exception as e:
+                consecutive_errors += 1
+                log.exception("Control loop error: %s", e)
+                if consecutive_errors >= max_consecutive_errors:
+                    log.error("%d consecutive control loop errors - activating safety stop",
+                              consecutive_errors)
                     self.emergency_stop = True
-
-            # High speed loop sleep
-            time.sleep(0.002)  # ~500Hz
+                    send_to_pico("stop")
+                    flush_output()
+
+            # Keep the selector in step with connects, disconnects and a lost Pico
+            wanted_socket = self.client_socket or self.server_socket
+            if wanted_socket is not watched_socket:
+                if watched_socket is not None:
+                    selector.unregister(watched_socket)
+                watched_socket = wanted_socket
+                if watched_socket is not None:
+                    selector.register(watched_socket, selectors.EVENT_READ)
+            if pico_fd is not None and not self.pico_serial:
+                selector.unregister(pico_fd)
+                pico_fd = None
+
+            # Wait for I/O or the soonest periodic task
+            next_due = min(last_status_time + status_interval,
+                           last_safety_check + safety_check_interval,
+                           last_heartbeat_check + heartbeat_check_interval)
+            if self.pico_streaming:
+                next_due = min(next_due, self.last_pico_status_time + pico_stale_timeout)
+            elif self.pico_serial:
+                next_due = min(next_due, last_pico_status_req + pico_status_interval)
+            timeout = max(next_due - now(), 0) / 1_000_000_000
+            if max_wait is not None:
+                timeout = min(timeout, max_wait)
+            wait_for_io(timeout)
+
+        selector.close()
 
     def shutdown(self):
         """Clean shutdown"""
         if self.pico_serial:
             self.send_to_pico("stop")
+            self.send_to_pico("stream 0")
+            self.flush_output()
             self.pico_serial.close()
 
         if self.server_socket:
@@ -538,52 +837,85 @@ class LatheController:
         if self.motor_controller:
             self.motor_controller.stop_motor()
 
-        print("Lathe controller shut down")
+        log.info("Lathe controller shut down")
 
-def main():
-    print("Haptic Lathe Controller Starting...")
+def probe_serial_port(port):
+    """Return True if the serial port exists and can be opened"""
+    try:
+        serial.Serial(port, 921600, timeout=0.1).close()
+        return True
+    except (serial.SerialException, OSError, ValueError):
+        return False
+
+def preferred_pico_ports():
+    """Ports known to be the Pico, most likely first"""
+    ports = []
 
     # Check environment variable first (from launcher)
     env_port = os.environ.get("PICO_SERIAL_PORT")
-    
-    # List of ports to try
-    pico_ports = []
     if env_port:
-        pico_ports.append(env_port)
-        
-    # Add fallbacks
-    pico_ports.extend(["/dev/cu.usbmodem11401", "/dev/cu.usbmodem1401", "/dev/cu.usbmodem2101", "/dev/tty.usbmodem2101", "/dev/ttyACM1", "/dev/ttyUSB1", "COM5", "COM6"])
-
-    controller = None
+        ports.append(env_port)
+
+    # Then whatever enumerates as a Pico by USB vendor ID
+    detected_port = find_pico_port()
+    if detected_port:
+        ports.append(detected_port)
+
+    # De-duplicate, keeping priority order
+    return list(dict.fromkeys(ports))
+
+def fallback_pico_ports():
+    """Any USB serial device that is actually present"""
+    ports = []
+    if os.name == "posix":
+        for pattern in ("/dev/cu.usbmodem*", "/dev/tty.usbmodem*", "/dev/ttyACM*", "/dev/ttyUSB*"):
+            ports.extend(sorted(glob.glob(pattern)))
+    else:
+        ports.extend(["COM5", "COM6"])
+    return ports
 
-    # Try to connect
-    for pico_port in pico_ports:
-        try:
-            print(f"Attempting connection on {pico_port}...")
-            controller = LatheController(pico_serial_port=pico_port)
-            if controller.pico_serial:
-                print(f"Successfully connected to Pico on {pico_port}")
-                break
-        except Exception as e:
-            print(f"Failed to initialize with {pico_port}: {e}")
-            continue
+def main():
+    # Plain messages on stdout, as the launcher echoes them; set
+    # LATHE_LOG_LEVEL=DEBUG to also see per-message Pico and haptic traffic
+    logging.basicConfig(level=os.environ.get("LATHE_LOG_LEVEL", "INFO").upper(),
+                        format="%(message)s", stream=sys.stdout)
+    log.info("Haptic Lathe Controller Starting...")
+
+    # Opening a serial port toggles DTR, which resets boards such as Arduinos,
+    # so the known Pico ports are tried one at a time and the probe stops at
+    # the first that opens
+    preferred_ports = preferred_pico_ports()
+    pico_port = next((port for port in preferred_ports if probe_serial_port(port)), None)
+
+    # Only if none of those opened, probe every other USB serial device at
+    # once rather than paying each open in turn, then take the first in order
+    if not pico_port:
+        pico_ports = [port for port in fallback_pico_ports() if port not in preferred_ports]
+        if pico_ports:
+            log.info("Probing for Pico on: %s", ", ".join(pico_ports))
+            with ThreadPoolExecutor(max_workers=len(pico_ports)) as pool:
+                for port, ok in zip(pico_ports, pool.map(probe_serial_port, pico_ports)):
+                    if ok:
+                        pico_port = port
+                        break
+    if not pico_port:
+        log.error("No Pico port could be opened. Continuing without Pico connection.")
 
-    if not controller:
-        print("Failed to initialize controller. Trying without Pico connection.")
-        try:
-            controller = LatheController(pico_serial_port="/dev/ttyACM1")
-        except Exception as e:
-            print(f"Failed to initialize basic controller: {e}")
-            return 1
+    try:
+        controller = LatheController(pico_serial_port=pico_port)
+    except Exception as e:
+        log.error("Failed to initialize controller: %s", e)
+        return 1
 
     try:
-        print("Controller initialized. Starting control loop...")
+        log.info("Controller initialized. Starting control loop...")
+        # Ready banner the launcher waits for before starting the GUI
+        print("BRIDGE_READY")
         controller.run_control_loop()
     except KeyboardInterrupt:
-        print("Interrupted by user")
+        log.info("Interrupted by user")
     finally:
-        if controller:
-            controller.shutdown()
+        controller.shutdown()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,36 @@
+"""
+Raspberry Pi Pico serial port discovery
+Shared by the upload, REPL and bridge scripts so the port scan runs once
+"""
+
+import functools
+
+import serial.tools.list_ports
+
+# USB vendor ID used by Raspberry Pi RP2040 boards (MicroPython firmware)
+PICO_USB_VID = 0x2E8A
+
+@functools.lru_cache(maxsize=1)
+def find_pico_port():
+    """Return the device path of the first connected Pico, or None.
+
+    Matches on the USB vendor ID rather than the device name, so it works the
+    same on macOS (cu.usbmodem*), Linux (ttyACM*) and Windows (COM*). The
+    result is cached, as enumerating ports is slow on some platforms; call
+    find_pico_port.cache_clear() after a failed open to rescan.
+    """
+    for port in serial.tools.list_ports.comports():
+        if port.vid == PICO_USB_VID:
+            return port.device
+    return None
+
+def enable_low_latency(ser):
+    """Ask the driver to deliver received bytes immediately.
+
+    Sets ASYNC_LOW_LATENCY on Linux, which removes the 16 ms latency timer of
+    FTDI-style adapters. Other platforms and drivers ignore the request.
+    """
+    try:
+        ser.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError):
+        pass
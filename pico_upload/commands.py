@@ -0,0 +1,199 @@
+"""
+Serial command handlers for the Pico motor controller
+Shared by main.py (bridge protocol) and motor_control.main() (standalone REPL)
+
+Each handler takes the split command line and the MotorController. Returning
+False means the arguments didn't match, which is reported as an unknown
+command. Replies are printed as separate arguments rather than built with
+f-strings, so print() streams each piece out without allocating the line.
+"""
+
+import sys
+import select
+from motor_control import MODE_VELOCITY, MODE_POSITION
+
+HANDLERS = {}
+
+def register(name):
+    """Decorator adding a handler to HANDLERS under the command name"""
+    def add(handler):
+        HANDLERS[name] = handler
+        return handler
+    return add
+
+def dispatch(line, motor):
+    """Run one stripped, non-empty command line"""
+    parts = line.split()
+    handler = HANDLERS.get(parts[0].lower())
+    if handler is None or handler(parts, motor) is False:
+        print("ERROR: Unknown command:", line)
+
+class LineReader:
+    """Non-blocking stdin line reader
+
+    Bytes are copied one at a time into a preallocated buffer while stdin has
+    data, so a partial line never blocks the control loop (readline() would)
+    and nothing is allocated until a whole line is ready. Backspace and DEL
+    erase the last byte. With echo, typed bytes are written back, as the
+    standalone REPL's terminal doesn't echo them itself.
+    """
+    def __init__(self, size=128, echo=False):
+        self.buf = bytearray(size)
+        self.byte = bytearray(1)
+        self.length = 0
+        self.echo = echo
+        poller = select.poll()
+        poller.register(sys.stdin, select.POLLIN)
+        # ipoll() reuses one result tuple; poll() would build a new list of
+        # tuples on every call
+        self.ipoll = poller.ipoll
+        self.readinto = sys.stdin.buffer.readinto
+        self.write = sys.stdout.buffer.write
+
+    def readline(self):
+        """Return the next non-empty line, stripped, or None if there isn't one yet"""
+        buf = self.buf
+        byte = self.byte
+        size = len(buf)
+        ipoll = self.ipoll
+        echo = self.echo
+        while True:
+            for _ in ipoll(0):
+                break
+            else:
+                return None  # Nothing waiting on stdin
+            if not self.readinto(byte):
+                break
+            c = byte[0]
+            if c == 10 or c == 13:  # \n or \r ends a line
+                if echo:
+                    self.write(b"\r\n")
+                n = self.length
+                self.length = 0
+                if 0 < n <= size:
+                    line = buf[:n].decode().strip()
+                    if line:
+                        return line
+            elif c == 8 or c == 127:  # Backspace or DEL
+                if 0 < self.length <= size:
+                    self.length -= 1
+                    if echo:
+                        self.write(b"\b \b")
+            elif self.length < size:
+                buf[self.length] = c
+                self.length += 1
+                if echo:
+                    self.write(byte)
+            elif self.length == size:
+                print("ERROR: Command too long")
+                self.length = size + 1  # Drop the rest of the line
+        return None
+
+    def wait(self, timeout_ms):
+        """Idle until stdin has data or timeout_ms has passed"""
+        for _ in self.ipoll(timeout_ms):
+            break
+
+def print_status(motor):
+    # "Position: <deg> degrees, Velocity: <rpm> RPM, Mode: <mode>[, Wall ...]"
+    print("Position:", "%.2f" % motor.get_position_degrees(), "degrees, Velocity:",
+          "%.2f" % motor.get_velocity_rpm(), "RPM, Mode:", motor.control_mode,
+          end="")
+    if motor.wall_engaged:
+        print(", Wall @ ", "%.2f" % motor.wall_contact_position_deg,
+              "°, dir=", "%+d" % motor.wall_direction,
+              ", force=", "%.1f" % motor.wall_force_newtons, "N", sep="", end="")
+    print()
+
+@register("vel")
+def cmd_vel(parts, motor):
+    if len(parts) != 2:
+        return False
+    target_velocity = float(parts[1])
+    motor.target_velocity = target_velocity
+    motor.set_mode(MODE_VELOCITY)
+    print("OK: Velocity set to", target_velocity, "RPM")
+
+@register("pos")
+def cmd_pos(parts, motor):
+    if len(parts) != 2:
+        return False
+    target_position = float(parts[1])
+    motor.target_position = target_position
+    motor.set_mode(MODE_POSITION)
+    # Reset PID integral when starting new position command
+    motor.reset_pid()
+    print("OK: Moving to", target_position, "degrees")
+
+@register("hold")
+def cmd_hold(parts, motor):
+    motor.hold_position_here()
+
+@register("spring_wall")
+def cmd_spring_wall(parts, motor):
+    # spring_wall <forceN> [active|rpm_hint] [freqHz] [yieldN]
+    try:
+        if len(parts) < 2:
+            print("ERROR: spring_wall command requires at least a force argument.")
+            return
+
+        force = float(parts[1])
+        wall_active = float(parts[2]) if len(parts) > 2 else 1.0
+        freq = 10.0
+        yield_force = 50.0 # Default yield force
+
+        if len(parts) > 3:
+            freq = float(parts[3])
+        if len(parts) > 4:
+            yield_force = float(parts[4])
+
+        motor.set_spring_wall(force, wall_active, freq, yield_force)
+        print("OK: Spring wall set: ", force, "N, Active: ", wall_active, ", Freq: ", freq,
+              "Hz, Yield: ", yield_force, "N", sep="")
+    except ValueError:
+        print("ERROR: Invalid spring_wall arguments. Usage: spring_wall <forceN> [active] [freqHz] [yieldN]")
+
+@register("stop")
+def cmd_stop(parts, motor):
+    motor.stop_motor()
+    print("OK: Motor stopped")
+
+@register("status")
+def cmd_status(parts, motor):
+    print_status(motor)
+
+@register("zero")
+def cmd_zero(parts, motor):
+    motor.zero_position()
+    print("OK: Position zeroed")
+
+@register("pid")
+def cmd_pid(parts, motor):
+    if len(parts) != 4:
+        return False
+    motor.set_pid_gains(float(parts[1]), float(parts[2]), float(parts[3]))
+
+@register("haptic")
+def cmd_haptic(parts, motor):
+    if len(parts) != 2:
+        return False
+    brake_percent = float(parts[1])
+    motor.set_haptic_feedback(brake_percent)
+    print("OK: Haptic feedback set to ", "%.1f" % (brake_percent * 100), "%", sep="")
+
+@register("force")
+def cmd_force(parts, motor):
+    if len(parts) != 3:
+        return False
+    force_value = float(parts[1])
+    motor_rpm = float(parts[2])
+    motor.set_force_feedback(force_value, motor_rpm)
+    print("OK: Force feedback set to ", "%.2f" % force_value, "N at ", "%.1f" % motor_rpm,
+          " RPM", sep="")
+
+@register("raw")
+def cmd_raw(parts, motor):
+    if len(parts) != 4:
+        return False
+    motor.set_raw_driver(parts[1], parts[2], parts[3])
+    print("OK: Raw driver set")
@@ -14,11 +14,95 @@ CQR37D Specifications:
 """
 
 import machine
+import micropython
+from micropython import const
 import time
 import math
+from array import array
 from machine import Pin, PWM
-import select
-import sys
+import rp2
+
+# PIO quadrature decoder. Samples A (in_base) and B (in_base + 1) as
+# state = (B << 1) | A and does a computed jump on (prev << 2) | new, so
+# every valid edge adjusts the count in X and invalid transitions are
+# ignored. The current count is pushed (non-blocking) on every pass.
+# mov(pc, isr) jumps to an absolute address, so the program is padded to
+# the full 32 instructions to force it to load at offset 0.
+@rp2.asm_pio(in_shiftdir=rp2.PIO.SHIFT_LEFT, out_shiftdir=rp2.PIO.SHIFT_RIGHT)
+def quadrature_decoder():
+    jmp("sample")            # 00 -> 00: no change
+    jmp("decrement")         # 00 -> 01: reverse
+    jmp("increment")         # 00 -> 10: forward
+    jmp("sample")            # 00 -> 11: invalid
+    jmp("increment")         # 01 -> 00: forward
+    jmp("sample")            # 01 -> 01: no change
+    jmp("sample")            # 01 -> 10: invalid
+    jmp("decrement")         # 01 -> 11: reverse
+    jmp("decrement")         # 10 -> 00: reverse
+    jmp("sample")            # 10 -> 01: invalid
+    jmp("sample")            # 10 -> 10: no change
+    jmp("increment")         # 10 -> 11: forward
+    jmp("sample")            # 11 -> 00: invalid
+    jmp("increment")         # 11 -> 01: forward
+    label("decrement")
+    jmp(x_dec, "sample")     # 11 -> 10: reverse
+    label("sample")          # 11 -> 11: no change
+    mov(osr, isr)            # keep the (prev, new) history
+    mov(isr, x)
+    push(noblock)            # publish the current count
+    out(isr, 2)              # new state becomes prev state
+    in_(pins, 2)             # shift in the next sample
+    mov(pc, isr)             # jump into the table above
+    label("increment")
+    mov(x, invert(x))        # x + 1 == ~(~x - 1)
+    jmp(x_dec, "increment_done")
+    label("increment_done")
+    mov(x, invert(x))
+    jmp("sample")
+    nop()
+    nop()
+    nop()
+    nop()
+    nop()
+    nop()
+    nop()
+
+# SIO GPIO_IN register: all pin levels in one 32-bit read. The encoder is
+# on GP6 (A) and GP7 (B), so (GPIO_IN >> 6) & 3 is the (B << 1) | A state.
+SIO_GPIO_IN = const(0xD0000004)
+ENCODER_PIN_SHIFT = const(6)
+
+# Signed count delta for the interrupt fallback, indexed like the PIO jump
+# table by (prev_state << 2) | new_state. 0xFF means -1; invalid transitions
+# (both channels changed) map to 0 so glitches never miscount.
+QUAD_LUT = bytes((0, 0xFF, 1, 0, 1, 0, 0, 0xFF, 0xFF, 0, 0, 1, 0, 1, 0xFF, 0))
+
+# Hardware constants, inlined by the compiler on the hot paths. The matching
+# MotorController attributes report the configuration.
+ENCODER_CPR = const(64)      # Counts per revolution (motor shaft)
+PWM_FREQ_HZ = const(1000)
+MAX_PWM = const(65535)
+MIN_PWM = const(1000)        # Minimum PWM to overcome motor deadband
+PWM_SPAN = const(MAX_PWM - MIN_PWM)
+
+# Control modes. The 100Hz loop dispatches on these small ints; MODE_NAMES
+# gives the name reported in status lines (MotorController.control_mode).
+MODE_VELOCITY = const(0)
+MODE_POSITION = const(1)
+MODE_VIRTUAL_WALL = const(2)
+MODE_RAW = const(3)
+MODE_NAMES = ("velocity", "position", "virtual_wall", "raw")
+
+# Position PID runs at 100Hz in fixed point (the RP2040 has no FPU). The
+# error is kept in whole encoder counts and each gain is pre-scaled per count
+# (and per tick), so the products stay small ints (no heap allocation) for
+# errors up to ~20 output turns.
+CONTROL_PERIOD_MS = const(10)  # Control tick period used by the command loops
+PID_RATE_HZ = const(1000 // CONTROL_PERIOD_MS)
+PID_GAIN_SHIFT = const(16)     # P and D gains are Q16.16
+PID_KI_SHIFT = const(24)       # I gain is tiny per count-tick, so Q8.24
+PID_OUTPUT_SHIFT = const(8)    # Output is RPM in Q24.8
+PID_OUTPUT_LIMIT = const(50 << 8)  # Max RPM for position control
 
 # Motor and Encoder Configuration
 class MotorController:
@@ -33,16 +117,33 @@ class MotorController:
         self.motor_ena_enabled = True  # Track if PWM is active
         self.motor_in1 = Pin(2, Pin.OUT)  # GP2, Pico pin 4 - Direction control (IN1)
         self.motor_in2 = Pin(1, Pin.OUT)  # GP1, Pico pin 2 - Direction control (IN2)
+        # Bound pin/PWM setters for the speed path (set_duty is refreshed in motor_enable)
+        self.set_in1 = self.motor_in1.value
+        self.set_in2 = self.motor_in2.value
+        self.set_duty = self.motor_ena.duty_u16
 
         # Encoder configuration
-        self.CPR = 64  # Counts per revolution (motor shaft)
+        self.CPR = ENCODER_CPR  # Counts per revolution (motor shaft)
         self.gear_ratio = 30.0  # Example gear ratio (adjust based on your motor)
-        self.counts_per_output_rev = self.CPR * self.gear_ratio
+        # CPR counts A-channel edges only (x2); the decoders see every edge of
+        # both channels (x4), so there are twice as many counts per turn
+        self.counts_per_output_rev = self.CPR * 2 * self.gear_ratio
+        # Fixed scale factors, so conversions multiply instead of divide
+        self.deg_per_count = 360.0 / self.counts_per_output_rev
+        self.counts_per_degree = self.counts_per_output_rev / 360.0
+        self.rpm_per_count = 60.0 / self.counts_per_output_rev
 
         # Position tracking
         self.encoder_count = 0
-        self.last_a_state = self.encoder_a.value()
-        self.last_b_state = self.encoder_b.value()
+        # Interrupt fallback state lives in preallocated buffers so the viper
+        # ISR can update it without touching the heap:
+        #   isr_count = [count, invalid transitions]
+        #   isr_state = [AB state, missed-edge report pending]
+        self.isr_count = array('i', [0, 0])
+        self.isr_state = bytearray(((self.encoder_b.value() << 1) | self.encoder_a.value(), 0))
+        # Pre-bound so the hard IRQ can schedule it without allocating
+        self.missed_edge_report = self.report_missed_edges
+        self.last_missed_edge_print_ms = time.ticks_ms()
 
         # Velocity tracking
         self.last_time = time.ticks_us()
@@ -53,15 +154,16 @@ class MotorController:
         self.target_position = 0.0  # degrees
         self.target_velocity = 0.0  # RPM
         self.current_position = 0.0  # degrees
-        self.control_mode = "velocity"  # "position" or "velocity"
+        self.set_mode(MODE_VELOCITY)
         self.last_motion_sign = 0  # Tracks last observed rotation direction
 
         # PID parameters for position control
         self.kp = 2.0
         self.ki = 0.1
         self.kd = 0.05
-        self.integral_error = 0.0
-        self.last_position_error = 0.0
+        self.update_pid_gains()
+        self.integral_error = 0  # Sum of the error over ticks [counts]
+        self.last_position_error = 0  # [counts]
 
         # Virtual wall (encoder-backed hold) state
         self.wall_engaged = False
@@ -76,57 +178,117 @@ class MotorController:
         self.last_wall_error = 0.0
         self.last_wall_time_ms = time.ticks_ms()
         self.prev_position_deg = 0.0
+        self.next_debug_print_ms = self.last_wall_time_ms  # Rate limits wall debug output
 
         # Haptic feedback
         self.haptic_brake_percent = 0.0  # 0.0 to 1.0 (0% to 100% braking)
+        self.next_brake_print_ms = time.ticks_ms()  # Rate limits brake debug output
         self.vib_freq = 10.0  # Default vibration frequency [Hz]
         self.yield_force = 50.0  # Force at which wall yields (cuts) [N]
 
         # PWM configuration
-        self.motor_ena.freq(1000)  # 1kHz PWM frequency
-        self.max_pwm = 65535
-        self.min_pwm = 1000  # Minimum PWM to overcome motor deadband
+        self.motor_ena.freq(PWM_FREQ_HZ)  # 1kHz PWM frequency
+        self.max_pwm = MAX_PWM
+        self.min_pwm = MIN_PWM
+        # Speed commands map linearly onto the PWM range; assuming max RPM is
+        # around 100-200 for the geared motor, adjust as needed
+        self.max_rpm = 150.0
+        self.pwm_per_rpm = PWM_SPAN / self.max_rpm
         # Limit the braking duty cycle to avoid overheating while keeping it proportional
         self.max_brake_scale = 0.6
 
-        # Setup encoder interrupts
-        self.encoder_a.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, handler=self.encoder_callback)
-        self.encoder_b.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, handler=self.encoder_callback)
+        # Decode the encoder in a PIO state machine (GP6 = A, GP7 = B) so no
+        # edges are lost at speed; fall back to pin interrupts if PIO is busy
+        self.encoder_sm = None
+        try:
+            self.encoder_sm = rp2.StateMachine(0, quadrature_decoder, freq=10_000_000, in_base=self.encoder_a)
+            # Encoded once, so zero_position() doesn't assemble them again
+            self.encoder_clear = rp2.asm_pio_encode("set(x, 0)", 0)
+            self.encoder_sample = rp2.asm_pio_encode("in_(pins, 2)", 0)
+            self.encoder_sm.exec(self.encoder_clear)
+            self.encoder_sm.exec(self.encoder_sample)
+            self.encoder_sm.active(1)
+        except (OSError, ValueError) as e:
+            print(f"PIO encoder unavailable ({e}), using pin interrupts")
+            self.encoder_sm = None
+            self.encoder_a.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, handler=self.encoder_callback, hard=True)
+            self.encoder_b.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, handler=self.encoder_callback, hard=True)
 
         print("Motor controller initialized")
         print(f"Encoder CPR: {self.CPR}, Gear ratio: {self.gear_ratio}")
         print(f"Counts per output revolution: {self.counts_per_output_rev}")
 
+    @micropython.viper
     def encoder_callback(self, pin):
-        """Interrupt handler for encoder signals"""
-        a_state = self.encoder_a.value()
-        b_state = self.encoder_b.value()
-
-        # Quadrature decoding
-        if a_state != self.last_a_state:
-            if a_state == b_state:
-                self.encoder_count += 1
-            else:
-                self.encoder_count -= 1
+        """Interrupt handler for encoder signals (fallback when PIO is unavailable)
 
-        self.last_a_state = a_state
-        self.last_b_state = b_state
+        Compiled to native code and run as a hard IRQ, so it must not allocate.
+        Reporting of missed edges is deferred to micropython.schedule().
+        """
+        state = ptr8(self.isr_state)
+        count = ptr32(self.isr_count)
+        lut = ptr8(QUAD_LUT)
+        gpio_in = ptr32(SIO_GPIO_IN)
+        old_state = int(state[0])
+        new_state = (gpio_in[0] >> ENCODER_PIN_SHIFT) & 3
+        delta = int(lut[(old_state << 2) | new_state])
+        count[0] = int(count[0]) + delta - ((delta & 0x80) << 1)
+        state[0] = new_state
+
+        # Both channels changed between interrupts: an edge was missed
+        if delta == 0 and new_state != old_state:
+            count[1] = int(count[1]) + 1
+            if int(state[1]) == 0:
+                state[1] = 1
+                micropython.schedule(self.missed_edge_report, 0)
+
+    def report_missed_edges(self, _):
+        """Report invalid encoder transitions (scheduled from the ISR, at most 1 Hz)"""
+        self.isr_state[1] = 0
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.last_missed_edge_print_ms) >= 1000:
+            self.last_missed_edge_print_ms = now
+            print(f"Encoder: {self.isr_count[1]} invalid transitions (missed edges)")
+
+    def read_encoder_count(self):
+        """Get the latest encoder count, refreshed from the PIO decoder if active"""
+        sm = self.encoder_sm
+        if sm is not None:
+            # Drop stale values, then take a fresh one (pushed every few cycles)
+            for _ in range(sm.rx_fifo()):
+                sm.get()
+            count = sm.get()
+            self.encoder_count = count - 0x100000000 if count & 0x80000000 else count
+        else:
+            self.encoder_count = self.isr_count[0]
+        return self.encoder_count
 
     def get_position_degrees(self):
         """Get current position in degrees"""
-        revolutions = self.encoder_count / self.counts_per_output_rev
-        return revolutions * 360.0
+        return self.read_encoder_count() * self.deg_per_count
 
     def get_velocity_rpm(self):
         """Calculate current velocity in RPM"""
-        current_time = time.ticks_us()
-        current_count = self.encoder_count
-
-        dt = time.ticks_diff(current_time, self.last_time) / 1000000.0  # seconds
-        if dt > 0.01:  # Update every 10ms minimum
+        if self.encoder_sm is not None:
+            # sm.get() can block and allocate, so it never runs with IRQs off;
+            # the PIO count doesn't depend on interrupts anyway
+            current_count = self.read_encoder_count()
+            current_time = time.ticks_us()
+        else:
+            # Take the ISR count and its timestamp with interrupts off, so an
+            # encoder IRQ can't land between them and skew the rate
+            irq_state = machine.disable_irq()
+            try:
+                current_count = self.isr_count[0]
+                current_time = time.ticks_us()
+            finally:
+                machine.enable_irq(irq_state)
+            self.encoder_count = current_count
+
+        # Update every 10ms minimum (compared in integer microseconds)
+        if time.ticks_diff(current_time, self.last_time) > 10000:
             count_diff = current_count - self.last_count
-            rev_per_sec = count_diff / self.counts_per_output_rev
-            self.current_velocity = rev_per_sec * 60.0
+            self.current_velocity = count_diff * self.rpm_per_count
             if count_diff > 0:
                 self.last_motion_sign = 1
             elif count_diff < 0:
@@ -137,6 +299,7 @@ class MotorController:
 
         return self.current_velocity
 
+    @micropython.native
     def set_motor_speed(self, speed_rpm):
         """Set motor speed in RPM (positive = one direction, negative = other)"""
         # Update target velocity tracker so haptic logic knows the current command
@@ -146,11 +309,15 @@ class MotorController:
         if self._apply_haptic_brake():
             return
 
-        if abs(speed_rpm) < 0.1:  # Stop threshold
+        set_in1 = self.set_in1
+        set_in2 = self.set_in2
+        magnitude = -speed_rpm if speed_rpm < 0 else speed_rpm
+
+        if magnitude < 0.1:  # Stop threshold
             self.motor_disable()  # True free spin
             # Set both IN pins HIGH for symmetric coast
-            self.motor_in1.value(1)
-            self.motor_in2.value(1)
+            set_in1(1)
+            set_in2(1)
             self.last_motion_sign = 0
             return
 
@@ -158,22 +325,20 @@ class MotorController:
         # Forward: IN1=HIGH, IN2=LOW
         # Reverse: IN1=LOW, IN2=HIGH
         if speed_rpm > 0:
-            self.motor_in1.value(1)
-            self.motor_in2.value(0)
+            set_in1(1)
+            set_in2(0)
             self.last_motion_sign = 1
         else:
-            self.motor_in1.value(0)
-            self.motor_in2.value(1)
+            set_in1(0)
+            set_in2(1)
             self.last_motion_sign = -1
 
         # Speed (scale RPM to PWM duty cycle)
-        # Assuming max RPM is around 100-200 for geared motor, adjust as needed
-        max_rpm = 150.0
-        duty_percent = min(abs(speed_rpm) / max_rpm, 1.0)
-
-        duty_value = int(self.min_pwm + (self.max_pwm - self.min_pwm) * duty_percent)
+        duty_value = MIN_PWM + int(magnitude * self.pwm_per_rpm)
+        if duty_value > MAX_PWM:
+            duty_value = MAX_PWM
         self.motor_enable()  # Ensure PWM mode is active
-        self.motor_ena.duty_u16(duty_value)
+        self.set_duty(duty_value)
 
     def _apply_haptic_brake(self):
         """Apply electromagnetic braking using Hapkit-style torque control.
@@ -200,33 +365,65 @@ class MotorController:
 
         # Clamp duty cycle and convert to PWM value
         duty_float = min(duty_float, 1.0)
-        duty_value = int(duty_float * (self.max_pwm - self.min_pwm) + self.min_pwm)
+        duty_value = int(duty_float * PWM_SPAN + MIN_PWM)
 
         # Apply PWM duty cycle for controlled braking torque
         self.motor_ena.duty_u16(duty_value)
 
-        print(f"🧱 Hapkit virtual wall: brake_percent={brake_percent:.3f}, duty_float={duty_float:.3f}, PWM={duty_value}")
+        # This runs on every control tick, so only report at 5Hz
+        now_ms = time.ticks_ms()
+        if time.ticks_diff(now_ms, self.next_brake_print_ms) >= 0:
+            self.next_brake_print_ms = time.ticks_add(now_ms, 200)
+            print(f"🧱 Hapkit virtual wall: brake_percent={brake_percent:.3f}, duty_float={duty_float:.3f}, PWM={duty_value}")
         return True
 
+    def update_pid_gains(self):
+        """Scale kp/ki/kd (per degree, per second) to the fixed-point PID units"""
+        deg_per_count = self.deg_per_count
+        # Gains are per count (P), per count-tick (I) and per count/tick (D),
+        # with the 1/100 s tick folded in; products are then shifted to Q24.8
+        self.kp_q = int(self.kp * deg_per_count * (1 << PID_GAIN_SHIFT))
+        self.ki_q = int(self.ki * deg_per_count / PID_RATE_HZ * (1 << PID_KI_SHIFT))
+        self.kd_q = int(self.kd * deg_per_count * PID_RATE_HZ * (1 << PID_GAIN_SHIFT))
+        # Anti-windup at 100 degree-seconds, in count-ticks
+        self.integral_limit = int(100.0 * PID_RATE_HZ / deg_per_count)
+
+    def reset_pid(self):
+        """Clear the integral and derivative history, e.g. for a new target"""
+        self.integral_error = 0
+        self.last_position_error = 0
+
+    def set_mode(self, mode):
+        """Switch control mode (one of the MODE_* constants)"""
+        self.mode = mode
+        self.control_mode = MODE_NAMES[mode]
+
     def position_control(self):
-        """PID position control"""
-        current_pos = self.get_position_degrees()
-        error = self.target_position - current_pos
+        """PID position control (integer arithmetic, 100Hz)"""
+        error = int(self.target_position * self.counts_per_degree) - self.read_encoder_count()
 
         # PID calculations
-        self.integral_error += error * 0.01  # Assuming 100Hz control loop
-        self.integral_error = max(-100, min(100, self.integral_error))  # Anti-windup
-
-        derivative_error = (error - self.last_position_error) / 0.01
+        integral = self.integral_error + error
+        limit = self.integral_limit
+        if integral > limit:  # Anti-windup
+            integral = limit
+        elif integral < -limit:
+            integral = -limit
+        self.integral_error = integral
+
+        derivative = error - self.last_position_error
         self.last_position_error = error
 
-        output = self.kp * error + self.ki * self.integral_error + self.kd * derivative_error
+        output = (((self.kp_q * error + self.kd_q * derivative) >> (PID_GAIN_SHIFT - PID_OUTPUT_SHIFT))
+                  + ((self.ki_q * integral) >> (PID_KI_SHIFT - PID_OUTPUT_SHIFT)))
 
         # Convert position error to velocity command
-        max_velocity = 50.0  # Max RPM for position control
-        velocity_command = max(-max_velocity, min(max_velocity, output))
+        if output > PID_OUTPUT_LIMIT:
+            output = PID_OUTPUT_LIMIT
+        elif output < -PID_OUTPUT_LIMIT:
+            output = -PID_OUTPUT_LIMIT
 
-        self.set_motor_speed(velocity_command)
+        self.set_motor_speed(output / (1 << PID_OUTPUT_SHIFT))
 
     def velocity_control(self):
         """Direct velocity control"""
@@ -240,7 +437,7 @@ class MotorController:
         self.target_velocity = 0.0
         self.last_motion_sign = 0
         self.wall_engaged = False
-        self.control_mode = "velocity"
+        self.set_mode(MODE_VELOCITY)
 
     def motor_disable(self):
         """Disable motor by driving ENA LOW as GPIO (true free spin)"""
@@ -254,22 +451,41 @@ class MotorController:
         """Re-enable motor PWM control"""
         if not self.motor_ena_enabled:
             self.motor_ena = PWM(Pin(0))  # Re-init as PWM
-            self.motor_ena.freq(1000)
+            self.motor_ena.freq(PWM_FREQ_HZ)
+            self.set_duty = self.motor_ena.duty_u16
             self.motor_ena_enabled = True
 
     def hold_position_here(self):
         """Capture current encoder position and hold it with PID."""
         self.target_position = self.get_position_degrees()
-        self.integral_error = 0.0
-        self.last_position_error = 0.0
-        self.control_mode = "position"
+        self.reset_pid()
+        self.set_mode(MODE_POSITION)
         print(f"Holding position at {self.target_position:.2f} degrees")
 
     def zero_position(self):
         """Zero the position counter"""
-        self.encoder_count = 0
-        self.integral_error = 0.0
-        self.last_position_error = 0.0
+        sm = self.encoder_sm
+        if sm is not None:
+            # Stop the decoder and restart it from the top of the program with
+            # X cleared, so it can't be caught halfway through an increment,
+            # and drop counts pushed before the reset
+            sm.active(0)
+            sm.restart()
+            sm.exec(self.encoder_clear)
+            sm.exec(self.encoder_sample)
+            for _ in range(sm.rx_fifo()):
+                sm.get()
+            sm.active(1)
+        # Reset the counter and the velocity reference together
+        irq_state = machine.disable_irq()
+        try:
+            self.isr_count[0] = 0
+            self.encoder_count = 0
+            self.last_count = 0
+            self.last_time = time.ticks_us()
+        finally:
+            machine.enable_irq(irq_state)
+        self.reset_pid()
         print("Position zeroed")
 
     def set_haptic_feedback(self, brake_percent):
@@ -311,9 +527,7 @@ class MotorController:
                 self.motor_in2.value(1)
 
             # Scale RPM to PWM duty cycle
-            max_rpm = 150.0
-            duty_percent = min(abs(motor_rpm) / max_rpm, 1.0)
-            duty_value = int(self.min_pwm + (self.max_pwm - self.min_pwm) * duty_percent)
+            duty_value = min(MIN_PWM + int(abs(motor_rpm) * self.pwm_per_rpm), MAX_PWM)
             self.motor_ena.duty_u16(duty_value)
 
         print(f"🧱 Active force feedback: {force_newtons:.2f}N, Motor: {motor_rpm:.1f} RPM")
@@ -323,7 +537,7 @@ class MotorController:
         self.motor_ena.duty_u16(int(ena_duty))
         self.motor_in1.value(int(in1))
         self.motor_in2.value(int(in2))
-        self.control_mode = "raw"
+        self.set_mode(MODE_RAW)
         print(f"Raw driver set: ENA={ena_duty}, IN1={in1}, IN2={in2}")
 
     def set_spring_wall(self, force_newtons, wall_flag=1, vib_freq=10.0, yield_force=50.0):
@@ -351,7 +565,7 @@ class MotorController:
         if not active:
             self.wall_engaged = False
             self.haptic_brake_percent = 0.0
-            self.control_mode = "velocity"
+            self.set_mode(MODE_VELOCITY)
             self.motor_disable()
             self.motor_in1.value(1)
             self.motor_in2.value(1)
@@ -380,7 +594,7 @@ class MotorController:
                 self.wall_direction = direction_hint
 
         self.wall_engaged = True
-        self.control_mode = "virtual_wall"
+        self.set_mode(MODE_VIRTUAL_WALL)
         self.haptic_brake_percent = 0.0
 
     def virtual_wall_control(self):
@@ -474,14 +688,13 @@ class MotorController:
             self.motor_in2.value(1)
         
         self.motor_enable()
-        duty_value = int(self.min_pwm + (self.max_pwm - self.min_pwm) * duty)
+        duty_value = int(MIN_PWM + PWM_SPAN * duty)
         self.motor_ena.duty_u16(duty_value)
         
-        # Rate limit debug output (every 50 loops = ~0.5s)
-        if not hasattr(self, "debug_counter"):
-            self.debug_counter = 0
-        self.debug_counter += 1
-        if self.debug_counter % 50 == 0:
+        # Rate limit debug output to one line per 0.5s
+        now_ms = time.ticks_ms()
+        if time.ticks_diff(now_ms, self.next_debug_print_ms) >= 0:
+            self.next_debug_print_ms = time.ticks_add(now_ms, 500)
             print(f"🧱 CUT: v={self.dxh_filt:.4f}m/s, depth={x_penetration*1000:.1f}mm, F={force:.2f}N, D={duty:.2f}")
 
     def set_pid_gains(self, kp, ki, kd):
@@ -489,6 +702,7 @@ class MotorController:
         self.kp = kp
         self.ki = ki
         self.kd = kd
+        self.update_pid_gains()
         print(f"PID gains set: Kp={kp}, Ki={ki}, Kd={kd}")
 
 def print_help():
@@ -500,119 +714,79 @@ def print_help():
     print("zero              - Zero position counter")
     print("pid <kp> <ki> <kd> - Set PID gains")
     print("hold              - Hold the current encoder position")
-    print("spring_wall <forceN> [active|rpm_hint] - Engage virtual wall at current position")
+    print("spring_wall <forceN> [active|rpm_hint] [freqHz] [yieldN] - Engage virtual wall at current position")
+    print("haptic <0-1>      - Set haptic braking level")
     print("status            - Show current status")
     print("help              - Show this help")
     print("quit              - Exit program")
 
 def main():
+    # Imported here: commands imports this module for the mode constants
+    from commands import dispatch, LineReader
+
     print("Raspberry Pi Pico CQR37D Motor Controller")
     print("==========================================")
 
     # Initialize motor controller
     motor = MotorController()
 
-    # Control loop timing
-    last_control_time = time.ticks_ms()
+    # Control loop timing, bound locally since the loop checks it on every
+    # wakeup (each control tick or incoming command)
+    ticks_ms = time.ticks_ms
+    ticks_add = time.ticks_add
+    ticks_diff = time.ticks_diff
+    next_control_time = ticks_add(ticks_ms(), CONTROL_PERIOD_MS)
+    position_control = motor.position_control
+    velocity_control = motor.velocity_control
+    virtual_wall_control = motor.virtual_wall_control
+    # Echo typed input, as input() did
+    command_reader = LineReader(echo=True)
+    read_command = command_reader.readline
+    wait_for_command = command_reader.wait
 
     print("\nType 'help' for available commands")
     print("Current mode: velocity control")
 
     while True:
         # Check for serial input
-        if select.select([sys.stdin], [], [], 0)[0]:
+        command = read_command()
+        if command:
             try:
-                command = input().strip().lower()
-                parts = command.split()
-
-                if not parts:
-                    continue
-
-                cmd = parts[0]
-
-                if cmd == "help":
+                command = command.lower()
+                if command == "help":
                     print_help()
 
-                elif cmd == "pos" and len(parts) == 2:
-                    try:
-                        target_pos = float(parts[1])
-                        motor.target_position = target_pos
-                        motor.control_mode = "position"
-                        print(f"Position control: target = {target_pos} degrees")
-                    except ValueError:
-                        print("Invalid position value")
-
-                elif cmd == "vel" and len(parts) == 2:
-                    try:
-                        target_vel = float(parts[1])
-                        motor.target_velocity = target_vel
-                        motor.control_mode = "velocity"
-                        print(f"Velocity control: target = {target_vel} RPM")
-                    except ValueError:
-                        print("Invalid velocity value")
-
-                elif cmd == "hold":
-                    motor.hold_position_here()
-
-                elif cmd == "spring_wall" and len(parts) >= 2:
-                    try:
-                        force_val = float(parts[1])
-                        wall_flag = float(parts[2]) if len(parts) >= 3 else 1.0
-                        motor.set_spring_wall(force_val, wall_flag)
-                        state = "engaged" if force_val > 0 and wall_flag != 0 else "released"
-                        print(f"Virtual wall {state}: force={force_val:.2f}N, flag={wall_flag}")
-                    except ValueError:
-                        print("Invalid spring_wall values")
-
-                elif cmd == "stop":
-                    motor.stop_motor()
-                    print("Motor stopped")
-
-                elif cmd == "zero":
-                    motor.zero_position()
-
-                elif cmd == "pid" and len(parts) == 4:
-                    try:
-                        kp = float(parts[1])
-                        ki = float(parts[2])
-                        kd = float(parts[3])
-                        motor.set_pid_gains(kp, ki, kd)
-                    except ValueError:
-                        print("Invalid PID values")
-
-                elif cmd == "status":
-                    current_pos = motor.get_position_degrees()
-                    current_vel = motor.get_velocity_rpm()
-                    status_line = f"Position: {current_pos:.2f} degrees, Velocity: {current_vel:.2f} RPM, Mode: {motor.control_mode}"
-                    if motor.wall_engaged:
-                        status_line += f", Wall @ {motor.wall_contact_position_deg:.2f}°, dir={motor.wall_direction:+d}, force={motor.wall_force_newtons:.1f}N"
-                    print(status_line)
-
-                elif cmd == "quit":
+                elif command == "quit":
                     motor.stop_motor()
                     print("Exiting...")
                     break
 
                 else:
-                    print("Unknown command. Type 'help' for available commands")
+                    dispatch(command, motor)
 
             except Exception as e:
                 print(f"Error processing command: {e}")
 
         # Control loop (100Hz)
-        current_time = time.ticks_ms()
-        if time.ticks_diff(current_time, last_control_time) >= 10:  # 10ms = 100Hz
-            if motor.control_mode == "position":
-                motor.position_control()
-            elif motor.control_mode == "velocity":
-                motor.velocity_control()
-            elif motor.control_mode == "virtual_wall":
-                motor.virtual_wall_control()
-
-            last_control_time = current_time
-
-        # Small delay to prevent busy waiting
-        time.sleep(0.001)
+        current_time = ticks_ms()
+        if ticks_diff(current_time, next_control_time) >= 0:  # 10ms = 100Hz
+            mode = motor.mode
+            if mode == MODE_POSITION:
+                position_control()
+            elif mode == MODE_VELOCITY:
+                velocity_control()
+            elif mode == MODE_VIRTUAL_WALL:
+                virtual_wall_control()
+
+            # Fixed deadlines keep the average rate at 100Hz; resync after a stall
+            next_control_time = ticks_add(next_control_time, CONTROL_PERIOD_MS)
+            if ticks_diff(current_time, next_control_time) >= 0:
+                next_control_time = ticks_add(current_time, CONTROL_PERIOD_MS)
+
+        # Idle until the next control tick, waking early if a command arrives
+        wait_ms = ticks_diff(next_control_time, ticks_ms())
+        if wait_ms > 0:
+            wait_for_command(wait_ms)
 
 if __name__ == "__main__":
     main()
@@ -9,7 +9,9 @@ import sys
 import os
 import time
 import signal
+import shutil
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 class IntegratedLauncher:
@@ -17,6 +19,7 @@ class IntegratedLauncher:
         self.controller_process = None
         self.processing_process = None
         self.running = True
+        self.controller_ready = threading.Event()
 
         # Install signal handler for clean shutdown
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -44,14 +47,9 @@ class IntegratedLauncher:
 
         # Check if Processing is available
         processing_found = False
-        try:
-            result = subprocess.run(["which", "processing"],
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                processing_found = True
-                print("✓ Processing IDE found")
-        except:
-            pass
+        if shutil.which("processing"):
+            processing_found = True
+            print("✓ Processing IDE found")
 
         if not processing_found:
             try:
@@ -73,6 +71,7 @@ class IntegratedLauncher:
     def find_serial_ports(self):
         """Find available serial ports for GUI and Pico"""
         import serial.tools.list_ports
+        from pico_port import PICO_USB_VID
 
         ports = list(serial.tools.list_ports.comports())
         available_ports = [port.device for port in ports]
@@ -81,7 +80,12 @@ class IntegratedLauncher:
 
         # Try to identify GUI and Pico ports
         gui_port = None
-        pico_port = None
+        # Match the vendor ID in the list we already have rather than calling
+        # find_pico_port(), which would enumerate the ports a second time
+        pico_port = next((port.device for port in ports if port.vid == PICO_USB_VID), None)
+        if pico_port:
+            # Identified by USB vendor ID; the GUI itself talks over TCP
+            return gui_port, pico_port
 
         # Improved port detection for macOS
         for port in available_ports:
@@ -103,7 +107,9 @@ class IntegratedLauncher:
         """Start the Python bridge controller"""
         print("Starting bridge controller...")
 
-        cmd = [sys.executable, "integrated_lathe_controller.py"]
+        # -u: the bridge's stdout is a pipe, so without it Python block-buffers
+        # the output and the monitor thread sees it in delayed 8 KB bursts
+        cmd = [sys.executable, "-u", "integrated_lathe_controller.py"]
 
         # Set environment variables for port configuration
         env = os.environ.copy()
@@ -164,26 +170,46 @@ class IntegratedLauncher:
             print(f"✗ Failed to start Processing GUI: {e}")
             return False
 
+    def monitor_output(self, process, name):
+        """Echo a process's output, flagging the bridge's ready banner"""
+        if process and process.stdout:
+            for line in iter(process.stdout.readline, ''):
+                line = line.strip()
+                if line:
+                    print(f"[{name}] {line}")
+                    if line == "BRIDGE_READY":
+                        self.controller_ready.set()
+        # Output ended; wake anyone still waiting for the banner
+        if process is self.controller_process:
+            process.wait()
+            self.controller_ready.set()
+
+    def wait_for_controller(self, timeout=5.0):
+        """Block until the bridge prints its ready banner, or fail after timeout"""
+        # The controller output is monitored from here on so the banner is seen
+        # as soon as it is printed
+        controller_thread = threading.Thread(
+            target=self.monitor_output,
+            args=(self.controller_process, "CONTROLLER"),
+            daemon=True
+        )
+        controller_thread.start()
+
+        if not self.controller_ready.wait(timeout):
+            print(f"✗ Bridge controller not ready after {timeout:.0f} s")
+            return False
+        if self.controller_process.poll() is not None:
+            print("✗ Bridge controller exited during startup")
+            return False
+        print("✓ Bridge controller ready")
+        return True
+
     def monitor_processes(self):
         """Monitor running processes and handle output"""
-        def monitor_output(process, name):
-            if process and process.stdout:
-                for line in iter(process.stdout.readline, ''):
-                    if line.strip():
-                        print(f"[{name}] {line.strip()}")
-
-        # Start monitoring threads
-        if self.controller_process:
-            controller_thread = threading.Thread(
-                target=monitor_output,
-                args=(self.controller_process, "CONTROLLER"),
-                daemon=True
-            )
-            controller_thread.start()
-
+        # The controller thread is already running from wait_for_controller
         if self.processing_process:
             processing_thread = threading.Thread(
-                target=monitor_output,
+                target=self.monitor_output,
                 args=(self.processing_process, "PROCESSING"),
                 daemon=True
             )
@@ -254,12 +280,17 @@ class IntegratedLauncher:
         print("Integrated Haptic Lathe System Launcher")
         print("=" * 40)
 
-        # Check dependencies
-        if not self.check_dependencies():
-            return 1
+        # Enumerating serial ports is independent of the dependency checks,
+        # so run it in the background while they complete
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            ports_future = pool.submit(self.find_serial_ports)
 
-        # Find serial ports
-        gui_port, pico_port = self.find_serial_ports()
+            # Check dependencies
+            if not self.check_dependencies():
+                return 1
+
+            # Find serial ports
+            gui_port, pico_port = ports_future.result()
 
         print(f"GUI Connection: TCP/IP (localhost:5005) [READY]")
 
@@ -273,8 +304,10 @@ class IntegratedLauncher:
             print("Failed to start system")
             return 1
 
-        # Give controller time to initialize
-        time.sleep(2)
+        # Wait for the controller to report it is listening
+        if not self.wait_for_controller():
+            self.cleanup()
+            return 1
 
         # Start Processing GUI
         if not self.start_processing_gui():
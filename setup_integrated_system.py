@@ -8,6 +8,7 @@ import subprocess
 import sys
 import os
 import platform
+import shutil
 from pathlib import Path
 
 def run_command(cmd, description):
@@ -59,7 +60,9 @@ def check_processing_installation():
 
     elif system == "Linux":
         # Check for processing command
-        if run_command("which processing", "Checking for Processing"):
+        processing_path = shutil.which("processing")
+        if processing_path:
+            print(f"✓ Processing found at {processing_path}")
             return True
         else:
             print("✗ Processing not found")
@@ -142,8 +145,13 @@ physical_input_default = true
 """
 
     try:
-        with open("lathe_config.ini", "w") as f:
+        # Write to a temporary file and rename it into place, so the config
+        # is never left truncated if the write fails part way
+        with open("lathe_config.ini.tmp", "w") as f:
             f.write(config_content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace("lathe_config.ini.tmp", "lathe_config.ini")
         print("✓ Configuration file created: lathe_config.ini")
         return True
     except Exception as e:
@@ -157,8 +165,11 @@ def check_file_permissions():
         "integrated_lathe_controller.py"
     ]
 
+    # One directory scan instead of a stat() per file
+    present = {entry.name for entry in os.scandir('.')}
+
     for file in files_to_check:
-        if os.path.exists(file):
+        if file in present:
             # Make executable on Unix systems
             if platform.system() != "Windows":
                 try: